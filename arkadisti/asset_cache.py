@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from uuid import uuid4
+
+from .http_session import get_client
+
+ASSET_CACHE_SIZE = 64 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class AssetCache:
+    def __init__(self, cache_dir, max_size=ASSET_CACHE_SIZE):
+        self.blobs_dir = Path(cache_dir) / "assets"
+        self.refs_dir = self.blobs_dir / "refs"
+        self.refs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.size = None
+
+    def measure(self):
+        size = 0
+        for blob in self.blobs_dir.iterdir():
+            if not blob.is_file():
+                continue
+            if blob.name.endswith(".part"):
+                blob.unlink(missing_ok=True)
+            else:
+                size += blob.stat().st_size
+        return size
+
+    @staticmethod
+    def url_key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, url):
+        ref = self.refs_dir / self.url_key(url)
+        try:
+            blob = self.blobs_dir / ref.read_text().strip()
+            os.utime(blob)
+        except OSError:
+            return None
+        return blob
+
+    def fetch(self, url):
+        blob = self.get(url)
+        if blob:
+            return blob
+
+        with self.lock:
+            if self.size is None:
+                self.size = self.measure()
+
+        digest = hashlib.sha256()
+        part = self.blobs_dir / ("%s.part" % uuid4())
+        try:
+            with get_client().get(url, stream=True) as r:
+                r.raise_for_status()
+                with part.open("wb") as f:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+
+            blob = self.blobs_dir / digest.hexdigest()
+            with self.lock:
+                if blob.exists():
+                    part.unlink()
+                else:
+                    self.size += part.stat().st_size
+                    os.replace(part, blob)
+                (self.refs_dir / self.url_key(url)).write_text(blob.name)
+                self.evict()
+        finally:
+            part.unlink(missing_ok=True)
+
+        return blob
+
+    def evict(self):
+        if self.size <= self.max_size:
+            return
+
+        blobs = sorted(
+            (blob.stat().st_mtime, blob)
+            for blob in self.blobs_dir.iterdir()
+            if blob.is_file() and not blob.name.endswith(".part")
+        )
+        for _mtime, blob in blobs:
+            if self.size <= self.max_size:
+                break
+            self.size -= blob.stat().st_size
+            blob.unlink(missing_ok=True)
@@ -0,0 +1,177 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .profiler import timed
+
+SNAPSHOT_KEY = "leaderboards"
+CHANGES_KEY = "changes"
+HISTORY_KEYS = (SNAPSHOT_KEY, CHANGES_KEY)
+
+NEW = "new"
+IMPROVED = "improved"
+RANK = "rank"
+KINDS = {NEW: "Nový", IMPROVED: "Zlepšení", RANK: "Posun"}
+
+ENTRY_KEY = ["tournament", "game", "Player"]
+SNAPSHOT_COLUMNS = ENTRY_KEY + ["Rank", "Score", "version"]
+CHANGES_COLUMNS = [
+    "version",
+    "kind",
+    "tournament",
+    "game",
+    "Player",
+    "Rank",
+    "OldRank",
+    "Score",
+    "OldScore",
+]
+SNAPSHOT_ITEMSIZE = {"game": 32, "Player": 64}
+CHANGES_ITEMSIZE = {"kind": 8, "game": 32, "Player": 64}
+FEED_LIMIT = 1000
+TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+class Changes:
+    @staticmethod
+    def entries(results, version):
+        if not len(results):
+            return pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+
+        df = results[results["Player"].str.strip() != ""]
+        return (
+            df.sort_values(["tournament", "game", "Rank"], kind="stable")
+            .drop_duplicates(ENTRY_KEY)
+            .assign(version=version)
+            .astype(
+                {
+                    "tournament": np.int64,
+                    "Rank": np.int64,
+                    "Score": np.int64,
+                    "version": np.int64,
+                }
+            )[SNAPSHOT_COLUMNS]
+            .reset_index(drop=True)
+        )
+
+    @staticmethod
+    def diff(old, new, version):
+        if not len(new):
+            return pd.DataFrame(columns=CHANGES_COLUMNS)
+
+        merged = new.merge(
+            old[ENTRY_KEY + ["Rank", "Score"]],
+            on=ENTRY_KEY,
+            how="left",
+            suffixes=("", "Old"),
+            indicator=True,
+        )
+        added = (merged["_merge"] == "left_only").to_numpy()
+        old_rank = merged["RankOld"].fillna(0).to_numpy(dtype=np.int64)
+        old_score = merged["ScoreOld"].fillna(0).to_numpy(dtype=np.int64)
+        rank = merged["Rank"].to_numpy(dtype=np.int64)
+        score = merged["Score"].to_numpy(dtype=np.int64)
+        improved = ~added & (score > old_score)
+        moved = ~added & ~improved & (rank != old_rank)
+
+        kind = np.select([added, improved, moved], [NEW, IMPROVED, RANK], "")
+        changed = kind != ""
+        return pd.DataFrame(
+            {
+                "version": np.full(changed.sum(), version, dtype=np.int64),
+                "kind": kind[changed],
+                "tournament": merged["tournament"].to_numpy()[changed],
+                "game": merged["game"].to_numpy()[changed],
+                "Player": merged["Player"].to_numpy()[changed],
+                "Rank": rank[changed],
+                "OldRank": old_rank[changed],
+                "Score": score[changed],
+                "OldScore": old_score[changed],
+            }
+        )
+
+    @staticmethod
+    @timed("changes.record")
+    def record(storage, tournaments=None, version=None):
+        version = version or int(time.time())
+        columns = ["tournament", "game", "Player", "Rank", "Score"]
+        if tournaments is None:
+            where = None
+        else:
+            tournaments = sorted(set(map(int, tournaments)))
+            if not tournaments:
+                return 0
+            where = "tournament == %r" % tournaments
+
+        new = Changes.entries(storage.select_results(where, columns), version)
+        if SNAPSHOT_KEY not in storage:
+            changes = pd.DataFrame(columns=CHANGES_COLUMNS)
+        else:
+            old = storage.select(SNAPSHOT_KEY, where=where)
+            changes = Changes.diff(old, new, version)
+
+        storage.remove(SNAPSHOT_KEY, where=where)
+        storage.append(
+            SNAPSHOT_KEY,
+            new,
+            data_columns=["tournament", "game"],
+            min_itemsize=SNAPSHOT_ITEMSIZE,
+        )
+        storage.append(
+            CHANGES_KEY,
+            changes,
+            data_columns=["version", "tournament", "game", "Player"],
+            min_itemsize=CHANGES_ITEMSIZE,
+        )
+        return len(changes)
+
+    @staticmethod
+    def prune(storage, tournaments):
+        if SNAPSHOT_KEY not in storage:
+            return
+        existing = storage.select(SNAPSHOT_KEY, columns=["tournament"])
+        stale = sorted(
+            set(existing["tournament"].tolist()) - set(map(int, tournaments))
+        )
+        if stale:
+            storage.remove(SNAPSHOT_KEY, where="tournament == %r" % stale)
+
+    @staticmethod
+    def get_feed(storage, limit=FEED_LIMIT, since=None, game=None):
+        conditions = []
+        if since is not None:
+            conditions.append("version >= %d" % int(since))
+        if game:
+            conditions.append("game == %r" % str(game))
+        if conditions:
+            df = storage.select(CHANGES_KEY, where=" & ".join(conditions))
+        else:
+            start = storage.nrows(CHANGES_KEY) - limit if limit else 0
+            df = storage.select(CHANGES_KEY, start=max(0, start))
+        if not len(df):
+            return pd.DataFrame(columns=CHANGES_COLUMNS)
+        df = df.sort_values("version", ascending=False, kind="stable")
+        if limit:
+            df = df.head(limit)
+        return df.reset_index(drop=True)
+
+    @staticmethod
+    def display(df):
+        return pd.DataFrame(
+            {
+                "Time": [
+                    datetime.fromtimestamp(version).strftime(TIME_FORMAT)
+                    for version in df["version"]
+                ],
+                "Change": df["kind"].map(KINDS),
+                "tournament": df["tournament"],
+                "game": df["game"],
+                "Player": df["Player"],
+                "Rank": df["Rank"],
+                "OldRank": df["OldRank"],
+                "Score": df["Score"],
+                "OldScore": df["OldScore"],
+            }
+        )
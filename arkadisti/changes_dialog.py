@@ -0,0 +1,64 @@
+from PySide6.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QHBoxLayout,
+    QLineEdit,
+    QTableView,
+    QVBoxLayout,
+)
+
+from .changes import Changes
+from .results_model import ResultsModel
+
+
+class ChangesDialog(QDialog):
+    def __init__(self, storage, game=None, since=None, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Změny výsledků")
+        self.resize(720, 480)
+
+        self.storage = storage
+
+        layout = QVBoxLayout(self)
+        filters = QHBoxLayout()
+
+        self.combo = QComboBox()
+        self.combo.addItem("Všechny změny", (None, None))
+        if since is not None:
+            self.combo.addItem("Poslední synchronizace", (None, since))
+        if game:
+            self.combo.addItem("Hra: %s" % game, (game, None))
+        if since is not None:
+            self.combo.setCurrentIndex(1)
+        self.combo.currentIndexChanged.connect(self.reload)
+        filters.addWidget(self.combo)
+
+        self.player_edit = QLineEdit()
+        self.player_edit.setPlaceholderText("Hráč")
+        self.player_edit.textChanged.connect(self.reload)
+        filters.addWidget(self.player_edit)
+        layout.addLayout(filters)
+
+        self.model = ResultsModel()
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+
+        self.reload()
+
+    def reload(self, *_):
+        game, since = self.combo.currentData()
+        df = Changes.get_feed(self.storage, since=since, game=game)
+        player = self.player_edit.text().strip()
+        if player:
+            df = df[
+                df["Player"].str.contains(player, case=False, regex=False)
+            ]
+
+        self.model.beginResetModel()
+        self.model.set_data(Changes.display(df))
+        self.model.endResetModel()
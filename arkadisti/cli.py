@@ -0,0 +1,229 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+from .config_manager import ConfigManager
+from .profiler import profiler
+from .storage_manager import URL_COLUMNS, StorageManager
+
+FORMATS = ("tsv", "csv", "json")
+EXPORT_FORMATS = ("csv", "json", "parquet")
+
+
+def write_frame(df, fmt, output=None):
+    output = output or sys.stdout
+    if fmt == "json":
+        df.to_json(output, orient="records", force_ascii=False, indent=2)
+        if output is sys.stdout:
+            output.write("\n")
+    elif fmt == "parquet":
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, sep="\t" if fmt == "tsv" else ",", index=False)
+
+
+def progress(done, total):
+    print("Zpracováno turnajů: %d/%d" % (done, total), file=sys.stderr)
+
+
+def cmd_sync(args, storage):
+    from .scraper import Scraper
+
+    workers = args.workers or ConfigManager().get_sync_workers()
+    try:
+        changed = Scraper.download(
+            incremental=not args.full,
+            workers=workers,
+            progress=None if args.quiet else progress,
+            storage=storage,
+        )
+    except KeyboardInterrupt:
+        print("Stahování přerušeno", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print("Stahování selhalo: %s" % (e), file=sys.stderr)
+        return 1
+    print("Změněno turnajů: %d" % (changed), file=sys.stderr)
+    return 0
+
+
+def cmd_games(args, storage):
+    games = storage.get_games()
+    if not len(games):
+        print("Žádná data, spusť nejdřív sync", file=sys.stderr)
+        return 1
+    if args.tournament is not None:
+        games = games[games["round"] == str(args.tournament)]
+    columns = [
+        column for column in ("round", "games", "name") if column in games
+    ]
+    write_frame(games[columns], args.format)
+    return 0
+
+
+def latest_tournament(storage, game):
+    games = storage.get_games()
+    if not len(games):
+        return None
+    rounds = games.loc[games["games"] == game, "round"].dropna()
+    return int(rounds.astype(int).max()) if len(rounds) else None
+
+
+def cmd_leaderboard(args, storage):
+    if args.all:
+        df = storage.select_results("game == %r" % args.rom)
+        df = df.drop(columns=["game"], errors="ignore")
+    else:
+        tournament = args.tournament
+        if tournament is None:
+            tournament = latest_tournament(storage, args.rom)
+        if tournament is None:
+            print("Hra %s nenalezena" % (args.rom), file=sys.stderr)
+            return 1
+        df = storage.get_results(args.rom, tournament)
+
+    if not len(df):
+        print("Žádné výsledky pro %s" % (args.rom), file=sys.stderr)
+        return 1
+    if not args.urls:
+        df = df.drop(columns=URL_COLUMNS, errors="ignore")
+    if args.limit:
+        df = df.head(args.limit)
+    write_frame(df, args.format)
+    return 0
+
+
+def cmd_player(args, storage):
+    from .player_index import PlayerIndex
+
+    PlayerIndex.ensure(storage)
+    df = PlayerIndex.search(
+        storage, args.name, prefix=not args.exact, limit=args.limit
+    )
+    if not len(df):
+        print("Hráč %s nenalezen" % (args.name), file=sys.stderr)
+        return 1
+    write_frame(df, args.format)
+    return 0
+
+
+def cmd_changes(args, storage):
+    from .changes import Changes
+
+    df = Changes.get_feed(
+        storage, limit=args.limit, since=args.since, game=args.rom
+    )
+    if not len(df):
+        print("Žádné změny", file=sys.stderr)
+        return 1
+    write_frame(Changes.display(df), args.format)
+    return 0
+
+
+def cmd_export(args, storage):
+    fmt = args.format or (args.output.suffix.lstrip(".").lower())
+    if fmt not in EXPORT_FORMATS:
+        print("Neznámý formát: %s" % (fmt), file=sys.stderr)
+        return 2
+
+    if args.table == "games":
+        df = storage.get_games()
+    else:
+        df = storage.select_results()
+    try:
+        write_frame(df, fmt, args.output)
+    except ImportError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(
+        "Exportováno řádků: %d do %s" % (len(df), args.output),
+        file=sys.stderr,
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m arkadisti",
+        description="Arkadisti bez GUI",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="stáhne změněné turnaje")
+    sync.add_argument(
+        "--full", action="store_true", help="stáhne všechno znovu"
+    )
+    sync.add_argument(
+        "--workers", type=int, default=0, help="počet procesů pro parsování"
+    )
+    sync.add_argument("-q", "--quiet", action="store_true")
+    sync.set_defaults(func=cmd_sync)
+
+    games = commands.add_parser("games", help="vypíše hry")
+    games.add_argument("--tournament", type=int)
+    games.add_argument("--format", choices=FORMATS, default="tsv")
+    games.set_defaults(func=cmd_games)
+
+    leaderboard = commands.add_parser(
+        "leaderboard", help="vypíše výsledky hry"
+    )
+    leaderboard.add_argument("rom")
+    leaderboard.add_argument(
+        "--tournament", type=int, help="výchozí je poslední turnaj s hrou"
+    )
+    leaderboard.add_argument(
+        "--all", action="store_true", help="všechny turnaje s hrou"
+    )
+    leaderboard.add_argument("--limit", type=int)
+    leaderboard.add_argument(
+        "--urls", action="store_true", help="včetně odkazů na soubory"
+    )
+    leaderboard.add_argument("--format", choices=FORMATS, default="tsv")
+    leaderboard.set_defaults(func=cmd_leaderboard)
+
+    player = commands.add_parser("player", help="najde výsledky hráče")
+    player.add_argument("name")
+    player.add_argument(
+        "--exact", action="store_true", help="celé jméno, ne začátek"
+    )
+    player.add_argument("--limit", type=int)
+    player.add_argument("--format", choices=FORMATS, default="tsv")
+    player.set_defaults(func=cmd_player)
+
+    changes = commands.add_parser("changes", help="vypíše změny výsledků")
+    changes.add_argument("--rom", help="jen změny v této hře")
+    changes.add_argument(
+        "--since", type=int, help="jen změny od času (unix timestamp)"
+    )
+    changes.add_argument("--limit", type=int, default=100)
+    changes.add_argument("--format", choices=FORMATS, default="tsv")
+    changes.set_defaults(func=cmd_changes)
+
+    export = commands.add_parser("export", help="exportuje data do souboru")
+    export.add_argument("output", type=Path)
+    export.add_argument(
+        "--table", choices=("results", "games"), default="results"
+    )
+    export.add_argument(
+        "--format", choices=EXPORT_FORMATS, help="výchozí podle přípony"
+    )
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profiler.enable_from_env()
+    storage = StorageManager.instance()
+    try:
+        return args.func(args, storage)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        storage.close()
+        if profiler.enabled:
+            print("\n".join(profiler.summary()), file=sys.stderr)
+            profiler.write_trace()
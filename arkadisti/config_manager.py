@@ -1,13 +1,12 @@
 import configparser
+import os
 import platform
 from pathlib import Path
 
-from PySide6.QtCore import QObject
-
 CONFIG_FILE = "settings.ini"
 
 
-class ConfigManager(QObject):
+class ConfigManager:
     def __init__(self):
         self.config = configparser.ConfigParser()
 
@@ -35,6 +34,7 @@ class ConfigManager(QObject):
         inp_dir = str(Path("inp"))
         snap_dir = str(Path("snap"))
         output_dir = str(Path("output"))
+        cache_dir = str(Path("cache"))
 
         self.config["general"] = {
             "mame_binary": mame_bin,
@@ -42,6 +42,18 @@ class ConfigManager(QObject):
             "inp_dir": inp_dir,
             "snap_dir": snap_dir,
             "output_dir": output_dir,
+            "sync_workers": "0",
+            "cache_dir": cache_dir,
+            "asset_cache_mb": "64",
+            "package_compression": "deflate",
+            "package_level": "9",
+            "package_screenshot": "no",
+            "package_manifest": "no",
+            "package_workers": "0",
+            "http_max_age": "0",
+            "http_stale_while_revalidate": "0",
+            "profile": "no",
+            "profile_trace": "",
         }
 
         # with config_file.open(
@@ -74,5 +86,52 @@ class ConfigManager(QObject):
     def get_output_dir(self):
         return Path(self.config.get("general", "output_dir"))
 
+    def get_cache_dir(self):
+        return Path(self.config.get("general", "cache_dir", fallback="cache"))
+
+    def get_asset_cache_size(self):
+        size = self.config.getint("general", "asset_cache_mb", fallback=64)
+        return size * 1024 * 1024
+
+    def get_sync_workers(self):
+        workers = self.config.getint("general", "sync_workers", fallback=0)
+        return workers or os.cpu_count() or 1
+
+    def get_package_compression(self):
+        return self.config.get(
+            "general", "package_compression", fallback="deflate"
+        ).lower()
+
+    def get_package_level(self):
+        return self.config.getint("general", "package_level", fallback=9)
+
+    def get_package_screenshot(self):
+        return self.config.getboolean(
+            "general", "package_screenshot", fallback=False
+        )
+
+    def get_package_manifest(self):
+        return self.config.getboolean(
+            "general", "package_manifest", fallback=False
+        )
+
+    def get_package_workers(self):
+        workers = self.config.getint("general", "package_workers", fallback=0)
+        return workers or os.cpu_count() or 1
+
+    def get_http_max_age(self):
+        return self.config.getint("general", "http_max_age", fallback=0)
+
+    def get_http_stale(self):
+        return self.config.getint(
+            "general", "http_stale_while_revalidate", fallback=0
+        )
+
+    def get_profile(self):
+        return self.config.getboolean("general", "profile", fallback=False)
+
+    def get_profile_trace(self):
+        return self.config.get("general", "profile_trace", fallback="")
+
     def get_mame_binary(self):
         return Path(self.config.get("general", "mame_binary"))
@@ -1,76 +1,125 @@
-import pandas as pd
 from PySide6.QtCore import QAbstractListModel, Qt
 
-STORE_FILE = "store.h5"
+from .profiler import profiler, timed
+from .storage_manager import StorageManager
+from .text import normalize
+
+ROLE_COLUMNS = {
+    Qt.DisplayRole: "name",
+    Qt.UserRole: "games",
+    Qt.UserRole + 1: "tournament_id",
+    Qt.UserRole + 2: "method",
+    Qt.UserRole + 3: "action",
+    Qt.UserRole + 4: "round",
+}
+FUZZY_CUTOFF = 85
 
 
 class GamesModel(QAbstractListModel):
     def __init__(self):
         super().__init__()
-        store = pd.HDFStore(STORE_FILE)
-        if "games" in store:
-            self._data = store["games"]
-        else:
-            self._data = pd.DataFrame()
-        store.close()
+        self.storage = StorageManager.instance()
+        self.filter_text = ""
+        snapshot = self.storage.get_snapshot()
+        self.from_snapshot = snapshot is not None
+        self.set_snapshot(snapshot or {"index": [], "columns": {}})
 
         self.beginResetModel()
         self.endResetModel()
 
     def data(self, index, role):
+        if profiler.enabled:
+            profiler.count("games_model.data")
         row = index.row()
 
-        if row < 0 or row >= len(self._data):
+        if row < 0 or row >= len(self._rows):
             return None
 
-        if not isinstance(row, int):
+        values = self._values.get(role)
+        if values is None:
             return None
-
-        if role == Qt.DisplayRole:
-            try:
-                name = self._data.loc[row, "name"]
-            except Exception:
-                return None
-            return name
-        elif role == Qt.UserRole:
-            game = self._data.loc[row, "games"]
-            return game
-        elif role == Qt.UserRole+1:
-            tournament_id = self._data.loc[row, "tournament_id"]
-            return tournament_id
-        elif role == Qt.UserRole+2:
-            method = self._data.loc[row, "method"]
-            return method
-        elif role == Qt.UserRole+3:
-            action = self._data.loc[row, "action"]
-            return action
-        return None
+        return values[self._rows[row]]
 
     def rowCount(self, index):
-        return self._data.shape[0]
+        return len(self._rows)
 
     def columnCount(self, index):
-        return self._data.shape[1]
+        return len(self._columns)
 
     def headerData(self, section, orientation, role):
         # section is the index of the column/row.
         if role == Qt.ItemDataRole.DisplayRole:
             if orientation == Qt.Orientation.Horizontal:
-                return str(self._data.columns[section])
+                return self._columns[section]
 
             if orientation == Qt.Orientation.Vertical:
-                return str(self._data.index[section])
+                return self._index[self._rows[section]]
+
+    def set_data(self, df):
+        self.set_snapshot(self.storage.snapshot(df))
+
+    def set_snapshot(self, snapshot):
+        self._index = snapshot["index"]
+        self._columns = list(snapshot["columns"])
+        self._values = {
+            role: snapshot["columns"][column]
+            for role, column in ROLE_COLUMNS.items()
+            if column in snapshot["columns"]
+        }
+
+        rows = len(self._index)
+        names = self._values.get(Qt.DisplayRole, [""] * rows)
+        roms = self._values.get(Qt.UserRole, [""] * rows)
+        self._search = [
+            normalize("%s %s" % (name or "", rom or ""))
+            for name, rom in zip(names, roms, strict=True)
+        ]
+        self._rows = self.filter_rows(self.filter_text)
+
+    def filter_rows(self, text):
+        query = normalize(text).strip()
+        if not query:
+            return list(range(len(self._search)))
+
+        from rapidfuzz import fuzz, process
+
+        matches = {
+            row for row, value in enumerate(self._search) if query in value
+        }
+        matches.update(
+            row
+            for _value, _score, row in process.extract(
+                query,
+                self._search,
+                scorer=fuzz.partial_ratio,
+                score_cutoff=FUZZY_CUTOFF,
+                limit=None,
+            )
+        )
+        return sorted(matches)
+
+    @timed("games_model.set_filter")
+    def set_filter(self, text):
+        self.beginResetModel()
+        self.filter_text = text
+        self._rows = self.filter_rows(text)
+        self.endResetModel()
 
+    def find_row(self, game, tournament):
+        games = self._values.get(Qt.UserRole)
+        rounds = self._values.get(Qt.UserRole + 4)
+        if games is None or rounds is None:
+            return -1
+        for position, row in enumerate(self._rows):
+            if games[row] == game and rounds[row] == tournament:
+                return position
+        return -1
+
+    @timed("games_model.reload")
     def reload(self):
         self.beginResetModel()
-
-        with pd.HDFStore(STORE_FILE) as store:
-            if "games" in store:
-                self._data = store["games"]
-            else:
-                self._data = pd.DataFrame()
-
+        self.set_data(self.storage.get_games())
         self.endResetModel()
 
-    def get_games(self):
-        return self._data
+    def get_columns(self):
+        return self._columns
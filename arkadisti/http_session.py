@@ -0,0 +1,322 @@
+import email.utils
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+from uuid import uuid4
+
+TIMEOUT = (5, 30)
+POOL_SIZE = 8
+RETRIES = 4
+BACKOFF = 0.5
+BACKOFF_MAX = 30
+DEADLINE = 60
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30
+CACHED_HEADERS = ("ETag", "Content-Type", "X-WP-Total", "X-WP-TotalPages")
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CachedResponse:
+    def __init__(self, entry, stale=False):
+        from requests.structures import CaseInsensitiveDict
+
+        self.url = entry["url"]
+        self.status_code = entry["status"]
+        self.headers = CaseInsensitiveDict(entry["headers"])
+        self.text = entry["content"]
+        self.content = self.text.encode("utf-8")
+        self.time = entry["time"]
+        self.stale = stale
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened = None
+
+    def allow(self):
+        with self.lock:
+            if self.opened is None:
+                return True
+            if time.monotonic() - self.opened >= self.cooldown:
+                self.opened = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened = time.monotonic()
+
+
+class HttpClient:
+    def __init__(
+        self,
+        cache_dir=None,
+        timeout=TIMEOUT,
+        retries=RETRIES,
+        backoff=BACKOFF,
+        backoff_max=BACKOFF_MAX,
+        deadline=DEADLINE,
+        breaker_threshold=BREAKER_THRESHOLD,
+        breaker_cooldown=BREAKER_COOLDOWN,
+        max_age=0,
+        stale_while_revalidate=0,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.cache_dir = Path(cache_dir) / "http" if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.lock = threading.Lock()
+        self.breakers = {}
+        self.refreshing = set()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(
+                    self.breaker_threshold, self.breaker_cooldown
+                )
+            return self.breakers[host]
+
+    @staticmethod
+    def retry_after(response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            date = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, date.timestamp() - time.time())
+
+    def retry_delay(self, attempt, response=None):
+        if response is not None:
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                return retry_after
+        delay = min(self.backoff_max, self.backoff * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def request(self, method, url, deadline=None, **kwargs):
+        import requests
+
+        timeout = kwargs.pop("timeout", self.timeout)
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(
+                "Spojení s %s je dočasně pozastaveno" % urlsplit(url).netloc
+            )
+
+        end = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            remaining = max(0.1, end - time.monotonic())
+            response = error = None
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    timeout=tuple(min(value, remaining) for value in timeout),
+                    **kwargs,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.success()
+                    return response
+
+            delay = self.retry_delay(attempt, response)
+            if (
+                attempt >= self.retries
+                or delay > self.backoff_max
+                or time.monotonic() + delay > end
+            ):
+                breaker.failure()
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def cache_path(self, url, params=None):
+        key = url + "?" + urlencode(sorted((params or {}).items()))
+        return self.cache_dir / (
+            hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json"
+        )
+
+    def read_cache(self, path):
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def write_cache(self, path, response):
+        entry = {
+            "url": response.url,
+            "status": response.status_code,
+            "headers": {
+                key: response.headers[key]
+                for key in CACHED_HEADERS
+                if key in response.headers
+            },
+            "content": response.text,
+            "time": time.time(),
+        }
+        self.write_entry(path, entry)
+        return entry
+
+    def write_entry(self, path, entry):
+        part = path.with_suffix(".%s.part" % uuid4())
+        part.write_text(json.dumps(entry), encoding="utf-8")
+        os.replace(part, path)
+
+    def get_cached(
+        self,
+        url,
+        params=None,
+        max_age=None,
+        stale_while_revalidate=None,
+        stale_if_error=True,
+        **kwargs,
+    ):
+        import requests
+
+        if self.cache_dir is None:
+            return self.get(url, params=params, **kwargs)
+
+        max_age = self.max_age if max_age is None else max_age
+        if stale_while_revalidate is None:
+            stale_while_revalidate = self.stale_while_revalidate
+
+        path = self.cache_path(url, params)
+        entry = self.read_cache(path)
+        if entry:
+            age = time.time() - entry["time"]
+            if age < max_age:
+                return CachedResponse(entry)
+            if age < max_age + stale_while_revalidate:
+                self.refresh(path, url, params, entry, kwargs)
+                return CachedResponse(entry, stale=True)
+
+        try:
+            return self.revalidate(
+                path, url, params, entry, stale_if_error, **kwargs
+            )
+        except (requests.RequestException, CircuitOpenError):
+            if entry and stale_if_error:
+                return CachedResponse(entry, stale=True)
+            raise
+
+    def revalidate(
+        self, path, url, params, entry, stale_if_error=True, **kwargs
+    ):
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry and "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+
+        response = self.get(url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            entry["time"] = time.time()
+            self.write_entry(path, entry)
+            return CachedResponse(entry)
+        if response.status_code == 200:
+            self.write_cache(path, response)
+        elif (
+            stale_if_error
+            and entry
+            and response.status_code in RETRY_STATUSES
+        ):
+            return CachedResponse(entry, stale=True)
+        return response
+
+    def refresh(self, path, url, params, entry, kwargs):
+        with self.lock:
+            if path in self.refreshing:
+                return
+            self.refreshing.add(path)
+
+        def run():
+            try:
+                self.revalidate(path, url, params, entry, **kwargs)
+            except Exception:
+                pass
+            finally:
+                with self.lock:
+                    self.refreshing.discard(path)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from .config_manager import ConfigManager
+
+            config = ConfigManager()
+            _client = HttpClient(
+                config.get_cache_dir(),
+                max_age=config.get_http_max_age(),
+                stale_while_revalidate=config.get_http_stale(),
+            )
+    return _client
@@ -1,34 +1,60 @@
-import shutil
-import subprocess
 import sys
-import zipfile
+import threading
+import time
 from datetime import datetime
-from io import BytesIO
 from pathlib import Path
-from uuid import uuid4
 
-import requests
-from PySide6.QtCore import QModelIndex, Qt, QTimer
+from PySide6.QtCore import QModelIndex, Qt, QTimer, Signal
 from PySide6.QtGui import QIcon, QKeySequence, QShortcut
 from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox
 
 from .config_manager import ConfigManager
 from .games_model import GamesModel
+from .mame_probe import MameProbe
+from .mame_session import CRASHED, EXITED, RUNNING, MameSession
+from .package_worker import PackageWorker
+from .packager import Packager
+from .profiler import profiler
+from .replay_cache import ReplayCache
 from .res import rc_arkadisti  # noqa: F401
-from .results_model import ResultsModel
-from .scraper import Scraper
+from .results_model import SCREENSHOT_SIZE, ResultsModel
 from .screenshot_window import ScreenshotWindow
 from .settings_dialog import SettingsDialog
+from .storage_manager import StorageManager
+from .sync_worker import SyncWorker
+from .thumbnail_loader import ThumbnailLoader
 from .ui.ui_main_window import Ui_MainWindow
 
+PREFETCH_OFFSETS = (1, -1, 2, -2)
+REPLAY_PREFETCH = 3
+MAME_STATES = {
+    RUNNING: "MAME běží",
+    EXITED: "MAME ukončeno",
+    CRASHED: "MAME spadlo",
+}
+
 
 class MainWindow(QMainWindow):
-    def __init__(self, parent=None):
+    replay_downloaded = Signal(str, object)
+    store_loaded = Signal(object, str)
+
+    def __init__(self, parent=None, started=None):
         super().__init__(parent)
+        self.started = started or time.perf_counter()
+        self.first_paint = None
         self.selected_game = None
+        self.selected_tournament = None
         self.selected_input = None
+        self.sync_worker = None
+        self.sync_started = None
+        self.package_worker = None
+        self.closing = False
 
         self.config = ConfigManager()
+        profiler.enable_from_env(
+            self.config.get_profile(), self.config.get_profile_trace()
+        )
+        self.storage = StorageManager.instance()
 
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
@@ -50,9 +76,29 @@ class MainWindow(QMainWindow):
             self.on_selection_changed
         )
 
+        self.ui.searchEdit.textChanged.connect(self.search_changed)
+
+        self.thumbnails = ThumbnailLoader(
+            self.config.get_cache_dir(),
+            self.config.get_asset_cache_size(),
+            self,
+        )
+
+        self.replays = ReplayCache(self.config.get_cache_dir())
+        self.replay_downloaded.connect(self.on_replay_downloaded)
+
         self.results_model = ResultsModel()
+        self.results_model.set_thumbnails(self.thumbnails)
         self.ui.resultsTable.setModel(self.results_model)
         self.ui.resultsTable.verticalHeader().setVisible(False)
+        self.ui.resultsTable.verticalHeader().setDefaultSectionSize(
+            SCREENSHOT_SIZE.height() + 4
+        )
+        self.ui.resultsTable.setSortingEnabled(True)
+        self.ui.resultsTable.sortByColumn(0, Qt.AscendingOrder)
+        self.ui.resultsTable.selectionModel().currentChanged.connect(
+            self.on_selection_changed_table
+        )
 
         self.ui.playButton.clicked.connect(self.play_button_pressed)
         self.ui.replayButton.clicked.connect(self.replay_button_pressed)
@@ -70,21 +116,111 @@ class MainWindow(QMainWindow):
 
         self.ui.gamesView.doubleClicked.connect(self.play_button_pressed)
 
+        shortcut_search = QShortcut(QKeySequence("Ctrl+F"), self)
+        shortcut_search.activated.connect(self.ui.searchEdit.setFocus)
+
         shortcut_f2 = QShortcut(QKeySequence("F2"), self)
         shortcut_f2.activated.connect(self.replay_button_pressed)
 
         shortcut_f3 = QShortcut(QKeySequence("F3"), self)
         shortcut_f3.activated.connect(self.download_button_pressed)
 
-        QTimer.singleShot(1, self.data_check)
+        self.mame_session = MameSession(self)
+        self.mame_session.output.connect(self.log)
+        self.mame_session.state_changed.connect(self.mame_state_changed)
+        self.ui.killButton.clicked.connect(self.kill_button_pressed)
+        self.ui.killButton.setEnabled(False)
+
+        shortcut_f4 = QShortcut(QKeySequence("F4"), self)
+        shortcut_f4.activated.connect(self.kill_button_pressed)
+
+        self.ui.packButton.clicked.connect(self.pack_button_pressed)
+
+        shortcut_f5 = QShortcut(QKeySequence("F5"), self)
+        shortcut_f5.activated.connect(self.pack_button_pressed)
+
+        self.ui.standingsButton.clicked.connect(self.standings_button_pressed)
+
+        shortcut_f6 = QShortcut(QKeySequence("F6"), self)
+        shortcut_f6.activated.connect(self.standings_button_pressed)
+
+        shortcut_f7 = QShortcut(QKeySequence("F7"), self)
+        shortcut_f7.activated.connect(self.show_changes)
+
+        shortcut_f8 = QShortcut(QKeySequence("F8"), self)
+        shortcut_f8.activated.connect(self.search_player)
+
+        shortcut_f12 = QShortcut(QKeySequence("F12"), self)
+        shortcut_f12.activated.connect(self.log_profile)
+
+        self.mame_probe = MameProbe(self.config.get_cache_dir())
+        self.mame_probe.start(self.config.get_mame_binary())
+
+        self.store_loaded.connect(self.on_store_loaded)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_paint is None:
+            self.first_paint = time.perf_counter()
+            self.log(
+                "Okno zobrazeno za %d ms"
+                % ((self.first_paint - self.started) * 1000)
+            )
+            QTimer.singleShot(0, self.load_store)
+
+    def load_store(self):
+        threading.Thread(target=self.open_store, daemon=True).start()
+
+    def open_store(self):
+        try:
+            self.store_loaded.emit(self.storage.get_games(), "")
+        except Exception as e:
+            self.store_loaded.emit(None, str(e))
+
+    def on_store_loaded(self, games, error):
+        if error:
+            self.log("Nelze otevřít data: %s" % (error))
+            return
+        if not self.model.from_snapshot:
+            self.model.reload()
+        self.log(
+            "Data načtena za %d ms"
+            % ((time.perf_counter() - self.started) * 1000)
+        )
+        self.data_check()
+
+    def closeEvent(self, event):
+        workers = [
+            worker
+            for worker in (self.sync_worker, self.package_worker)
+            if worker
+        ]
+        if workers:
+            for worker in workers:
+                worker.cancel()
+            self.closing = True
+            self.hide()
+            event.ignore()
+            return
+        self.thumbnails.cancel()
+        self.mame_session.kill()
+        self.storage.close()
+        self.replays.close()
+        if profiler.enabled:
+            profiler.write_trace()
+        super().closeEvent(event)
+        if self.closing:
+            QApplication.quit()
 
     def data_check(self):
         games_count = self.model.rowCount(QModelIndex)
-        games = self.model.get_games()
-        if games_count == 0 or 'name' not in games.columns:
+        if (
+            games_count == 0
+            or 'name' not in self.model.get_columns()
+            or any(key not in self.storage for key in ("results", "sync"))
+            or not self.storage.results_encoded()
+        ):
             self.download_button_pressed()
-            first_index = self.model.index(0, 0)
-            self.ui.gamesView.setCurrentIndex(first_index)
 
     def play_button_pressed(self):
         if self.selected_game:
@@ -99,15 +235,10 @@ class MainWindow(QMainWindow):
                 )
                 return
 
-            nvram_directory = self.check_nvram_saved()
+            if self.warn_mame_running():
+                return
 
-            if nvram_directory:
-                QMessageBox.warning(
-                    self,
-                    "Warning",
-                    "Je ulozeno NVRAM, "
-                    "prosim smaz adresar %s" % (nvram_directory.resolve()),
-                )
+            if self.warn_nvram_saved(game):
                 return
 
             command = [
@@ -122,155 +253,345 @@ class MainWindow(QMainWindow):
                 '-nonvram_save',
             ]
             self.log("Spouštím: " + " ".join(str(x) for x in command))
-            result = subprocess.run(
-                command, cwd=".", capture_output=True, text=True
+            self.mame_session.start(
+                command,
+                lambda exit_code, crashed, stderr: self.play_finished(
+                    game, inp_file, exit_code, crashed, stderr
+                ),
             )
-            if result.returncode != 0:
-                QMessageBox.warning(self, "Error", result.stderr)
-            else:
-                screenshot_dlg = ScreenshotWindow(game)
-                if screenshot_dlg.exec():
-                    self.zip_inp(inp_file)
-                    screenshot_file = screenshot_dlg.result_data
-                    if not screenshot_file:
-                        QMessageBox.warning(
-                            self,
-                            "Poznámka",
-                            "Nebyl vybrán žádný screenshot, "
-                            "zkopírován pouze inp soubor."
-                        )
-                    else:
-                        shutil.copy(
-                            screenshot_dlg.result_data,
-                            Path(self.config.get_output_dir())
-                            / Path(inp_file.stem).with_suffix(
-                                screenshot_file.suffix
-                            ),
-                        )
-                        self.log("Vybrany screenshot %s"
-                                 % (str(screenshot_file)))
         else:
             QMessageBox.warning(self, "Warning", "Není vybrána žádná hra!")
 
-    def zip_inp(self, inp_file):
-        zip_file = (
-            self.config.get_output_dir()
-            / Path(inp_file.stem).with_suffix(".zip")
-        ).resolve()
+    def play_finished(self, game, inp_file, exit_code, crashed, stderr):
+        if crashed or exit_code != 0:
+            QMessageBox.warning(
+                self, "Error", stderr or "MAME skončilo (%d)" % (exit_code)
+            )
+            return
 
-        with zipfile.ZipFile(zip_file, "w") as zip_file_handle:
-            zip_file_handle.write(
-                self.config.get_inp_dir() / inp_file, inp_file
+        screenshot_dlg = ScreenshotWindow(game)
+        if screenshot_dlg.exec():
+            screenshot_file = screenshot_dlg.result_data
+            zip_file = Packager.from_config(self.config).package(
+                self.config.get_inp_dir() / inp_file, screenshot_file
             )
+            self.log("Zabaleno: %s" % (zip_file))
+            if not screenshot_file:
+                QMessageBox.warning(
+                    self,
+                    "Poznámka",
+                    "Nebyl vybrán žádný screenshot, "
+                    "zabalen pouze inp soubor."
+                )
+            else:
+                self.log("Vybrany screenshot %s"
+                         % (str(screenshot_file)))
+
+    def warn_mame_running(self):
+        if self.mame_session.is_running():
+            QMessageBox.warning(self, "Warning", "MAME už běží!")
+            return True
+        return False
+
+    def kill_button_pressed(self):
+        if self.mame_session.is_running():
+            self.log("Ukončuji MAME")
+            self.mame_session.kill()
+
+    def mame_state_changed(self, state):
+        self.ui.killButton.setEnabled(state == RUNNING)
+        self.statusBar().showMessage(MAME_STATES.get(state, state))
+
+    def pack_button_pressed(self):
+        if self.package_worker:
+            self.package_worker.cancel()
+            self.log("Ruším balení...")
+            return
+
+        self.log("Balím nahrávky...")
+        self.ui.packButton.setText("Zrušit (F5)")
+
+        self.package_worker = PackageWorker(
+            Packager.from_config(self.config),
+            self.config.get_inp_dir(),
+            self.config.get_package_workers(),
+            parent=self,
+        )
+        self.package_worker.progress.connect(self.pack_progress)
+        self.package_worker.completed.connect(self.pack_completed)
+        self.package_worker.failed.connect(self.pack_failed)
+        self.package_worker.finished.connect(self.pack_finished)
+        self.package_worker.start()
+
+    def pack_progress(self, done, total):
+        self.statusBar().showMessage("Zabaleno: %d/%d" % (done, total))
+
+    def pack_completed(self, packaged):
+        if self.package_worker.is_cancelled():
+            self.log("Balení zrušeno (zabaleno: %d)" % (packaged))
+        else:
+            self.log("Zabaleno nahrávek: %d" % (packaged))
+
+    def pack_failed(self, error):
+        self.log("Balení selhalo: %s" % (error))
+
+    def pack_finished(self):
+        self.package_worker.deleteLater()
+        self.package_worker = None
+        self.ui.packButton.setText("Zabal vše (F5)")
+        self.statusBar().clearMessage()
+        if self.closing:
+            self.close()
+
+    def standings_button_pressed(self):
+        from .standings_dialog import StandingsDialog
+
+        dlg = StandingsDialog(
+            self.storage, self.thumbnails, self.selected_game, self
+        )
+        dlg.exec()
 
     def settings_button_pressed(self):
         dlg = SettingsDialog()
         dlg.exec()
 
     def download_button_pressed(self):
-        self.log("Stahuji data...(může trvat pár sekund)")
-        Scraper.download()
-        self.log("Data stažena")
+        if self.sync_worker:
+            self.sync_worker.cancel()
+            self.log("Ruším stahování...")
+            return
+
+        self.log("Stahuji data...")
+        self.sync_started = int(time.time())
+        self.ui.downloadButton.setText("Zrušit (F3)")
+        self.statusBar().showMessage("Stahuji seznam turnajů...")
+
+        self.sync_worker = SyncWorker(
+            self.config.get_sync_workers(), parent=self
+        )
+        self.sync_worker.progress.connect(self.download_progress)
+        self.sync_worker.completed.connect(self.download_completed)
+        self.sync_worker.failed.connect(self.download_failed)
+        self.sync_worker.finished.connect(self.download_finished)
+        self.sync_worker.start()
+
+    def download_progress(self, done, total):
+        self.statusBar().showMessage(
+            "Zpracováno turnajů: %d/%d" % (done, total)
+        )
+
+    def download_completed(self, changed):
+        if self.closing:
+            return
+        if self.sync_worker.is_cancelled():
+            self.log("Stahování zrušeno")
+        else:
+            self.log("Data stažena (změněno turnajů: %d)" % (changed))
+            self.log_changes()
         self.model.reload()
-        self.results_model.reload(self.selected_game)
+        self.results_model.reload(
+            self.selected_game, self.selected_tournament
+        )
+        if not self.ui.gamesView.currentIndex().isValid():
+            self.ui.gamesView.setCurrentIndex(self.model.index(0, 0))
+        self.log_profile()
+
+    def log_changes(self):
+        from .changes import IMPROVED, NEW, Changes
+
+        changes = Changes.get_feed(
+            self.storage, limit=None, since=self.sync_started
+        )
+        if not len(changes):
+            return
+        kinds = changes["kind"].value_counts()
+        self.log(
+            "Nové záznamy: %d, zlepšení: %d, posuny: %d (F7)"
+            % (
+                kinds.get(NEW, 0),
+                kinds.get(IMPROVED, 0),
+                len(changes) - kinds.get(NEW, 0) - kinds.get(IMPROVED, 0),
+            )
+        )
+
+    def show_changes(self):
+        from .changes_dialog import ChangesDialog
+
+        dlg = ChangesDialog(
+            self.storage, self.selected_game, self.sync_started, self
+        )
+        dlg.exec()
+
+    def search_player(self):
+        from .player_search_dialog import PlayerSearchDialog
+
+        dlg = PlayerSearchDialog(self.storage, self)
+        dlg.game_selected.connect(self.select_game)
+        dlg.exec()
+
+    def select_game(self, game, tournament):
+        if self.model.find_row(game, tournament) < 0:
+            self.ui.searchEdit.clear()
+        row = self.model.find_row(game, tournament)
+        if row >= 0:
+            self.ui.gamesView.setCurrentIndex(self.model.index(row, 0))
+
+    def download_failed(self, error):
+        self.log("Stahování selhalo: %s" % (error))
+
+    def download_finished(self):
+        self.sync_worker.deleteLater()
+        self.sync_worker = None
+        self.ui.downloadButton.setText("Stáhni data (F3)")
+        self.statusBar().clearMessage()
+        if self.closing:
+            self.close()
 
     def replay_button_pressed(self):
         if not self.selected_input:
             QMessageBox.warning(self, "Warning", "Není vybrán žádný záznam!")
             return
         url = self.selected_input
+        game = self.selected_game
 
-        filename = Path(str(uuid4()) + ".inp")
-        filename_store = self.config.get_inp_dir() / filename
+        if self.warn_mame_running() or self.warn_nvram_saved(game):
+            return
+
+        inp_file = self.replays.get(url)
+        if inp_file:
+            self.start_replay(game, inp_file)
+            return
 
-        # Download ZIP into memory
         self.log("Stahuji %s" % (url))
-        response = requests.get(url)
-        zip_data = BytesIO(response.content)
+        self.replays.submit(url).add_done_callback(
+            lambda future: self.replay_downloaded.emit(game, future)
+        )
 
-        # Open ZIP from memory
-        with zipfile.ZipFile(zip_data) as z:
-            original_name = z.namelist()[0]
-            data = z.read(original_name)
+    def on_replay_downloaded(self, game, future):
+        try:
+            inp_file = future.result()
+        except Exception as e:
+            QMessageBox.warning(self, "Error", "Stažení selhalo: %s" % (e))
+            return
+        self.start_replay(game, inp_file)
 
-            with open(filename_store, "wb") as f:
-                f.write(data)
-            # z.extractall("output_folder")   # <-- extracted files go here
+    def start_replay(self, game, inp_file):
         command = [
             self.config.get_mame_binary().resolve(),
-            self.selected_game,
+            game,
             "-playback",
-            filename,
+            inp_file.name,
             "-input_directory",
-            self.config.get_inp_dir(),
+            inp_file.parent,
         ]
         self.log("Spouštím: " + " ".join(str(x) for x in command))
-        _ = subprocess.run(
-            command, cwd=".", capture_output=True, text=True
-        )
+        self.mame_session.start(command)
 
-        filename_store.unlink(missing_ok=True)
+    def prefetch_replays(self):
+        results = self.results_model.get_results()
+        if "Input" not in results.columns:
+            self.replays.prefetch([])
+            return
+        top = results.sort_values("Rank").head(REPLAY_PREFETCH)
+        self.replays.prefetch(top["Input"].tolist())
 
     def on_selection_changed(self, current: QModelIndex, *_):
         index = self.ui.gamesView.currentIndex()
         game = index.data(Qt.UserRole)
+        tournament = index.data(Qt.UserRole + 4)
 
         # self.results_model = ResultsModel(game)
         # self.ui.resultsTable.setModel(self.results_model)
-        self.results_model.reload(game)
-        self.ui.resultsTable.hideColumn(4)
-        self.ui.resultsTable.hideColumn(5)
-        self.ui.resultsTable.hideColumn(6)
-
-        self.ui.resultsTable.selectionModel().currentChanged.connect(
-            self.on_selection_changed_table
-        )
+        self.results_model.reload(game, tournament)
+        columns = self.results_model.get_results().columns
+        for position, column in enumerate(columns):
+            self.ui.resultsTable.setColumnHidden(
+                position, column in ("Avatar", "Input")
+            )
 
         self.selected_game = game
+        self.selected_tournament = tournament
         self.selected_avatar = None
         self.selected_input = None
         self.selected_screenshot = None
 
+        QTimer.singleShot(0, lambda: self.prefetch_results(index.row()))
+        QTimer.singleShot(0, self.prefetch_replays)
+
+    def prefetch_results(self, row):
+        indexes = [
+            self.model.index(row + offset, 0) for offset in PREFETCH_OFFSETS
+        ]
+        keys = [
+            (index.data(Qt.UserRole + 4), index.data(Qt.UserRole))
+            for index in indexes
+            if index.isValid()
+        ]
+        threading.Thread(
+            target=self.storage.prefetch, args=(keys,), daemon=True
+        ).start()
+
+    def search_changed(self, text):
+        self.model.set_filter(text)
+        row = self.model.find_row(
+            self.selected_game, self.selected_tournament
+        )
+        index = self.model.index(max(row, 0), 0)
+        self.ui.gamesView.setCurrentIndex(index)
+        if (index.data(Qt.UserRole), index.data(Qt.UserRole + 4)) != (
+            self.selected_game,
+            self.selected_tournament,
+        ):
+            self.on_selection_changed(index)
+
     def on_selection_changed_table(self, current: QModelIndex, *_):
         index = self.ui.resultsTable.currentIndex()
-        row = index.row()
-        self.selected_input = self.results_model.index(row, 5).data()
-        self.selected_screenshot = self.results_model.index(row, 6).data()
-        self.selected_avatar = self.results_model.index(row, 4).data()
+        results = self.results_model.get_results()
+        if index.row() < 0 or "Input" not in results.columns:
+            return
+        row = self.results_model.get_row(index.row())
+        self.selected_input = row["Input"]
+        self.selected_screenshot = row["Screenshot"]
+        self.selected_avatar = row["Avatar"]
+
+    def log_profile(self):
+        if not profiler.enabled:
+            return
+        self.log("Profil:\n" + "\n".join(profiler.summary()))
+        trace_file = profiler.write_trace()
+        if trace_file:
+            self.log("Trace uložen do %s" % (trace_file))
 
     def log(self, msg: str):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         msg_out = str("[%s] %s" % (str(current_time), msg))
         self.ui.logView.append(msg_out)
-        QApplication.processEvents()
-
-    def check_nvram_saved(self):
-        mame_binary_path = self.config.get_mame_binary().resolve()
-
-        command = [
-            mame_binary_path,
-            "-showconfig",
-        ]
-
-        result = subprocess.run(
-            command, cwd=".", capture_output=True, text=True
-        )
 
-        mame_config = result.stdout
-        nvram_save = [
-            line
-            for line in mame_config.splitlines()
-            if "nvram_directory" in line
-        ][0]
-        nvram_directory_setting = nvram_save.split()[1]
+    def check_nvram_saved(self, game):
+        mame_env = self.mame_probe.get(self.config.get_mame_binary())
+        if "nvram_directory" not in mame_env:
+            return False
 
-        nvram_directory = Path(nvram_directory_setting) / self.selected_game
+        nvram_directory = Path(mame_env["nvram_directory"]) / game
 
         if nvram_directory.exists() and nvram_directory.is_dir():
             return nvram_directory
         else:
             return False
 
+    def warn_nvram_saved(self, game):
+        nvram_directory = self.check_nvram_saved(game)
+
+        if nvram_directory:
+            QMessageBox.warning(
+                self,
+                "Warning",
+                "Je ulozeno NVRAM, "
+                "prosim smaz adresar %s" % (nvram_directory.resolve()),
+            )
+            return True
+        return False
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,99 @@
+import json
+import subprocess
+import threading
+from pathlib import Path
+
+from .profiler import timed
+
+PROBE_FILE = "mame_probe.json"
+PROBE_KEYS = (
+    "nvram_directory",
+    "cfg_directory",
+    "snapshot_directory",
+    "input_directory",
+    "rompath",
+    "inipath",
+)
+INI_FILES = ("mame.ini", "ini/mame.ini")
+PROBE_TIMEOUT = 10
+
+
+class MameProbe:
+    def __init__(self, cache_dir):
+        self.cache_file = Path(cache_dir) / PROBE_FILE
+        self.lock = threading.Lock()
+        self.key = None
+        self.env = None
+
+    @staticmethod
+    def cache_key(mame_binary):
+        key = [str(mame_binary), mame_binary.stat().st_mtime_ns]
+        for ini_file in INI_FILES:
+            ini_path = Path(ini_file)
+            key.append(
+                ini_path.stat().st_mtime_ns if ini_path.exists() else None
+            )
+        return key
+
+    def get(self, mame_binary):
+        mame_binary = Path(mame_binary).resolve()
+        if not mame_binary.exists():
+            return {}
+
+        with self.lock:
+            key = self.cache_key(mame_binary)
+            if self.key == key:
+                return self.env
+
+            if self.key is None and self.cache_file.exists():
+                try:
+                    cached = json.loads(self.cache_file.read_text())
+                except ValueError:
+                    cached = {}
+                if cached.get("key") == key:
+                    self.key, self.env = key, cached["env"]
+                    return self.env
+
+            try:
+                self.key, self.env = key, self.probe(mame_binary)
+            except subprocess.TimeoutExpired:
+                self.key, self.env = key, {}
+                return self.env
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_file.write_text(
+                json.dumps({"key": key, "env": self.env}, indent=2)
+            )
+            return self.env
+
+    def start(self, mame_binary):
+        threading.Thread(
+            target=self.get, args=(mame_binary,), daemon=True
+        ).start()
+
+    @staticmethod
+    @timed("mame.probe")
+    def probe(mame_binary):
+        result = subprocess.run(
+            [mame_binary, "-showconfig"],
+            cwd=".",
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT,
+        )
+
+        env = {}
+        for line in result.stdout.splitlines():
+            parts = line.split(None, 1)
+            if len(parts) == 2 and parts[0] in PROBE_KEYS:
+                env[parts[0]] = parts[1].strip().strip('"')
+
+        result = subprocess.run(
+            [mame_binary, "-version"],
+            cwd=".",
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT,
+        )
+        env["version"] = result.stdout.strip()
+
+        return env
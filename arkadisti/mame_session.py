@@ -0,0 +1,84 @@
+import time
+
+from PySide6.QtCore import QObject, QProcess, Signal
+
+from .profiler import profiler
+
+IDLE = "idle"
+RUNNING = "running"
+EXITED = "exited"
+CRASHED = "crashed"
+
+
+class MameSession(QObject):
+    output = Signal(str)
+    state_changed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.state = IDLE
+        self.callback = None
+        self.stderr = []
+        self.started = None
+        self.command = None
+
+        self.process = QProcess(self)
+        self.process.setWorkingDirectory(".")
+        self.process.readyReadStandardOutput.connect(self.read_stdout)
+        self.process.readyReadStandardError.connect(self.read_stderr)
+        self.process.started.connect(lambda: self.set_state(RUNNING))
+        self.process.errorOccurred.connect(self.on_error)
+        self.process.finished.connect(self.on_finished)
+
+    def is_running(self):
+        return self.process.state() != QProcess.NotRunning
+
+    def start(self, command, callback=None):
+        self.callback = callback
+        self.stderr = []
+        self.started = time.perf_counter_ns()
+        self.command = command
+        self.process.start(str(command[0]), [str(x) for x in command[1:]])
+
+    def kill(self):
+        if self.is_running():
+            self.process.kill()
+
+    def set_state(self, state):
+        self.state = state
+        self.state_changed.emit(state)
+
+    def read_stdout(self):
+        self.emit_lines(self.process.readAllStandardOutput())
+
+    def read_stderr(self):
+        lines = self.emit_lines(self.process.readAllStandardError())
+        self.stderr.extend(lines)
+
+    def emit_lines(self, data):
+        lines = [
+            line
+            for line in bytes(data).decode(errors="replace").splitlines()
+            if line.strip()
+        ]
+        for line in lines:
+            self.output.emit(line)
+        return lines
+
+    def on_error(self, error):
+        if error == QProcess.FailedToStart:
+            self.stderr.append(self.process.errorString())
+            self.on_finished(-1, QProcess.CrashExit)
+
+    def on_finished(self, exit_code, exit_status):
+        crashed = exit_status == QProcess.CrashExit
+        profiler.record(
+            "mame.session",
+            self.started,
+            time.perf_counter_ns(),
+            {"command": " ".join(str(x) for x in self.command[1:3])},
+        )
+        self.set_state(CRASHED if crashed else EXITED)
+        callback, self.callback = self.callback, None
+        if callback:
+            callback(exit_code, crashed, "\n".join(self.stderr))
@@ -0,0 +1,35 @@
+import threading
+
+from PySide6.QtCore import QThread, Signal
+
+
+class PackageWorker(QThread):
+    progress = Signal(int, int)
+    completed = Signal(int)
+    failed = Signal(str)
+
+    def __init__(self, packager, inp_dir, workers=None, parent=None):
+        super().__init__(parent)
+        self.packager = packager
+        self.inp_dir = inp_dir
+        self.workers = workers
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def run(self):
+        try:
+            packaged = self.packager.package_all(
+                self.inp_dir,
+                workers=self.workers,
+                progress=self.progress.emit,
+                cancel=self.cancel_event,
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.completed.emit(packaged)
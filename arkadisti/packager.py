@@ -0,0 +1,152 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+COMPRESSION = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+MANIFEST_FILE = "manifest.json"
+
+
+class Packager:
+    def __init__(
+        self,
+        output_dir,
+        compression="deflate",
+        level=None,
+        screenshot=False,
+        manifest=False,
+    ):
+        self.output_dir = Path(output_dir)
+        self.compression = compression
+        self.level = level
+        self.screenshot = screenshot
+        self.manifest = manifest
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.get_output_dir(),
+            config.get_package_compression(),
+            config.get_package_level(),
+            config.get_package_screenshot(),
+            config.get_package_manifest(),
+        )
+
+    def zip_path(self, inp_file):
+        return self.output_dir / Path(inp_file).with_suffix(".zip").name
+
+    def package(self, inp_path, screenshot=None):
+        inp_path = Path(inp_path)
+        zip_path = self.zip_path(inp_path)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        part = zip_path.with_suffix(".zip.part")
+        try:
+            with zipfile.ZipFile(
+                part,
+                "w",
+                compression=COMPRESSION.get(
+                    self.compression, zipfile.ZIP_DEFLATED
+                ),
+                compresslevel=self.level,
+            ) as z:
+                z.write(inp_path, inp_path.name)
+                if screenshot and self.screenshot:
+                    z.write(screenshot, inp_path.stem + screenshot.suffix)
+                if self.manifest:
+                    z.writestr(
+                        MANIFEST_FILE,
+                        json.dumps(
+                            self.manifest_data(inp_path, screenshot),
+                            indent=2,
+                        ),
+                    )
+            os.replace(part, zip_path)
+        finally:
+            part.unlink(missing_ok=True)
+
+        if screenshot and not self.screenshot:
+            shutil.copyfile(
+                screenshot,
+                self.output_dir / (inp_path.stem + screenshot.suffix),
+            )
+
+        return zip_path
+
+    @staticmethod
+    def manifest_data(inp_path, screenshot=None):
+        with inp_path.open("rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        game = inp_path.stem.rsplit("_", 1)[0]
+        stat = inp_path.stat()
+        return {
+            "game": game,
+            "inp": inp_path.name,
+            "size": stat.st_size,
+            "sha256": digest,
+            "recorded": datetime.fromtimestamp(stat.st_mtime).isoformat(
+                timespec="seconds"
+            ),
+            "screenshot": screenshot.name if screenshot else None,
+        }
+
+    def pending(self, inp_dir):
+        pending = []
+        with os.scandir(inp_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".inp"):
+                    continue
+                zip_path = self.zip_path(entry.name)
+                if (
+                    not zip_path.exists()
+                    or zip_path.stat().st_mtime < entry.stat().st_mtime
+                ):
+                    pending.append(Path(entry.path))
+        return sorted(pending)
+
+    def package_all(self, inp_dir, workers=None, progress=None, cancel=None):
+        pending = self.pending(inp_dir)
+        total = len(pending)
+        if progress:
+            progress(0, total)
+
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or total <= 1:
+            for done, inp_path in enumerate(pending, 1):
+                if cancel and cancel.is_set():
+                    return done - 1
+                self.package(inp_path)
+                if progress:
+                    progress(done, total)
+            return total
+
+        with ProcessPoolExecutor(
+            max_workers=min(workers, total),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(self.package, inp_path)
+                for inp_path in pending
+            ]
+            done = 0
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    done += 1
+                    if progress:
+                        progress(done, total)
+                    if cancel and cancel.is_set():
+                        break
+            finally:
+                executor.shutdown(cancel_futures=True)
+        return done
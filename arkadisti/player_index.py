@@ -0,0 +1,99 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from .profiler import timed
+from .text import normalize
+
+PLAYERS_KEY = "players"
+POSTING_COLUMNS = ["key", "Player", "tournament", "game", "Rank", "Score"]
+KEY_SIZE = 128
+PLAYERS_ITEMSIZE = {"key": KEY_SIZE, "Player": 64, "game": 32}
+SEARCH_LIMIT = 500
+
+_spaces = re.compile(r"\s+")
+_letters = str.maketrans(
+    {"ł": "l", "đ": "d", "ø": "o", "æ": "ae", "œ": "oe", "ı": "i"}
+)
+
+
+class PlayerIndex:
+    @staticmethod
+    def key(name):
+        text = _spaces.sub(" ", normalize(name).translate(_letters)).strip()
+        return text.encode("ascii", "backslashreplace").decode()[:KEY_SIZE]
+
+    @staticmethod
+    def postings(results):
+        if not len(results):
+            return pd.DataFrame(columns=POSTING_COLUMNS)
+
+        df = results[results["Player"].str.strip() != ""]
+        return (
+            df.assign(key=[PlayerIndex.key(player) for player in df["Player"]])
+            .astype(
+                {"tournament": np.int64, "Rank": np.int64, "Score": np.int64}
+            )[POSTING_COLUMNS]
+            .sort_values(["tournament", "game", "key"], kind="stable")
+            .reset_index(drop=True)
+        )
+
+    @staticmethod
+    @timed("player_index.rebuild")
+    def rebuild(storage):
+        storage.remove(PLAYERS_KEY)
+        PlayerIndex.write(storage, storage.select_results())
+
+    @staticmethod
+    @timed("player_index.update")
+    def update(storage, tournaments):
+        if PLAYERS_KEY not in storage:
+            PlayerIndex.rebuild(storage)
+            return
+
+        tournaments = sorted(set(map(int, tournaments)))
+        if not tournaments:
+            return
+        where = "tournament == %r" % tournaments
+        storage.remove(PLAYERS_KEY, where=where)
+        PlayerIndex.write(storage, storage.select_results(where))
+
+    @staticmethod
+    def write(storage, results):
+        storage.append(
+            PLAYERS_KEY,
+            PlayerIndex.postings(results),
+            data_columns=["key", "tournament"],
+            min_itemsize=PLAYERS_ITEMSIZE,
+        )
+        storage.create_index(PLAYERS_KEY, ["key", "tournament"])
+
+    @staticmethod
+    def ensure(storage):
+        if PLAYERS_KEY not in storage and "results" in storage:
+            PlayerIndex.rebuild(storage)
+
+    @staticmethod
+    @timed("player_index.search")
+    def search(storage, name, prefix=True, limit=SEARCH_LIMIT):
+        key = PlayerIndex.key(name)
+        if not key:
+            return pd.DataFrame(columns=POSTING_COLUMNS[1:])
+        if prefix:
+            upper = key[:-1] + chr(ord(key[-1]) + 1)
+            where = "key >= %r & key < %r" % (key, upper)
+        else:
+            where = "key == %r" % key
+
+        df = storage.select(PLAYERS_KEY, where=where)
+        if not len(df):
+            return pd.DataFrame(columns=POSTING_COLUMNS[1:])
+        df = df.sort_values(
+            ["key", "tournament", "Rank"],
+            ascending=[True, False, True],
+            kind="stable",
+        ).drop(columns=["key"])
+        if limit:
+            df = df.head(limit)
+        return df.reset_index(drop=True)
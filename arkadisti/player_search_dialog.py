@@ -0,0 +1,46 @@
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import QDialog, QLineEdit, QTableView, QVBoxLayout
+
+from .player_index import PlayerIndex
+from .results_model import ResultsModel
+
+
+class PlayerSearchDialog(QDialog):
+    game_selected = Signal(str, str)
+
+    def __init__(self, storage, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Hledat hráče")
+        self.resize(560, 420)
+
+        self.storage = storage
+        PlayerIndex.ensure(storage)
+
+        layout = QVBoxLayout(self)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Jméno hráče")
+        self.search_edit.textChanged.connect(self.search)
+        layout.addWidget(self.search_edit)
+
+        self.model = ResultsModel()
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSortingEnabled(True)
+        self.table.doubleClicked.connect(self.select_game)
+        layout.addWidget(self.table)
+
+        self.search("")
+
+    def search(self, text):
+        self.model.beginResetModel()
+        self.model.set_data(PlayerIndex.search(self.storage, text))
+        self.model.endResetModel()
+
+    def select_game(self, index):
+        row = self.model.get_row(index.row())
+        self.game_selected.emit(row["game"], str(row["tournament"]))
+        self.accept()
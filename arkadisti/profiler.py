@@ -0,0 +1,146 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+ENV_VAR = "ARKADISTI_PROFILE"
+
+_disabled = nullcontext()
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.events = []
+            self.stats = {}
+            self.counters = {}
+
+    def enable(self, trace_file=None):
+        self.enabled = True
+        self.trace_file = Path(trace_file) if trace_file else None
+
+    def enable_from_env(self, enabled=False, trace_file=None):
+        value = os.environ.get(ENV_VAR, "")
+        if value and value.lower() not in ("0", "no", "false"):
+            enabled = True
+            if value.lower() not in ("1", "yes", "true"):
+                trace_file = value
+        if enabled:
+            self.enable(trace_file)
+        return self.enabled
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _disabled
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter_ns(), args)
+
+    def record(self, name, start, end, args=None, pid=None, tid=None):
+        if not self.enabled:
+            return
+        duration = (end - start) / 1e6
+        with self.lock:
+            count, total, longest = self.stats.get(name, (0, 0.0, 0.0))
+            self.stats[name] = (
+                count + 1,
+                total + duration,
+                max(longest, duration),
+            )
+            event = {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": start / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid or os.getpid(),
+                "tid": tid or threading.get_ident(),
+            }
+            if args:
+                event["args"] = {key: str(v) for key, v in args.items()}
+            self.events.append(event)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, events):
+        for event in events:
+            start = int(event["ts"] * 1000)
+            self.record(
+                event["name"],
+                start,
+                start + int(event["dur"] * 1000),
+                event.get("args"),
+                event["pid"],
+                event["tid"],
+            )
+
+    def summary(self):
+        with self.lock:
+            stats = sorted(
+                self.stats.items(), key=lambda item: item[1][1], reverse=True
+            )
+            counters = sorted(self.counters.items())
+        lines = [
+            "%-28s %6d× %10.1f ms %9.1f ms max"
+            % (name, count, total, longest)
+            for name, (count, total, longest) in stats
+        ]
+        lines += ["%-28s %6d×" % (name, count) for name, count in counters]
+        return lines
+
+    def write_trace(self, path=None):
+        path = Path(path) if path else self.trace_file
+        if not path:
+            return None
+        with self.lock:
+            events = list(self.events)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+        )
+        return path
+
+
+profiler = Profiler()
+
+
+def span(name, **args):
+    return profiler.span(name, **args)
+
+
+def capture(func, *args):
+    profiler.enable()
+    profiler.reset()
+    result = func(*args)
+    return result, profiler.events
+
+
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
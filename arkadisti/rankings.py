@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+
+from .profiler import timed
+
+STANDINGS_KEY = "standings"
+OVERALL_KEY = "overall"
+BESTS_KEY = "bests"
+
+PLACEMENT_POINTS = np.array([25, 18, 15, 12, 10, 8, 6, 4, 2, 1, 0])
+RESULT_COLUMNS = ["tournament", "game", "Rank", "Player", "Score", "Avatar"]
+STANDINGS_COLUMNS = [
+    "tournament",
+    "Player",
+    "Points",
+    "Games",
+    "Wins",
+    "Podiums",
+    "Percentile",
+    "BestRank",
+    "Avatar",
+]
+OVERALL_COLUMNS = [
+    "Player",
+    "Points",
+    "Tournaments",
+    "Games",
+    "Wins",
+    "Podiums",
+    "Percentile",
+    "BestRank",
+    "Avatar",
+]
+BESTS_COLUMNS = ["game", "Player", "Score", "tournament"]
+STANDINGS_ITEMSIZE = {"Player": 64, "values": 512}
+BESTS_ITEMSIZE = {"game": 32, "Player": 64}
+
+
+class Rankings:
+    @staticmethod
+    def placements(results):
+        df = results[results["Player"].str.strip() != ""]
+        df = df.sort_values(["tournament", "game", "Rank"]).drop_duplicates(
+            ["tournament", "game", "Player"]
+        )
+
+        rank = df["Rank"].to_numpy(dtype=np.int64)
+        players = (
+            df.groupby(["tournament", "game"], observed=True)["Rank"]
+            .transform("size")
+            .to_numpy(dtype=np.int64)
+        )
+        position = np.clip(rank - 1, 0, len(PLACEMENT_POINTS) - 1)
+        return df.assign(
+            Points=PLACEMENT_POINTS[position],
+            Percentile=np.clip(100.0 * (players - rank + 1) / players, 0, 100),
+            Win=rank == 1,
+            Podium=rank <= 3,
+        )
+
+    @staticmethod
+    def tournament_standings(results):
+        if not len(results):
+            return pd.DataFrame(columns=STANDINGS_COLUMNS)
+
+        df = Rankings.placements(results)
+        standings = (
+            df.groupby(["tournament", "Player"], sort=False, observed=True)
+            .agg(
+                Points=("Points", "sum"),
+                Games=("game", "nunique"),
+                Wins=("Win", "sum"),
+                Podiums=("Podium", "sum"),
+                Percentile=("Percentile", "mean"),
+                BestRank=("Rank", "min"),
+                Avatar=("Avatar", "first"),
+            )
+            .reset_index()
+        )
+        return standings.astype(
+            {
+                "tournament": np.int64,
+                "Points": np.int64,
+                "Games": np.int64,
+                "Wins": np.int64,
+                "Podiums": np.int64,
+                "BestRank": np.int64,
+            }
+        )[STANDINGS_COLUMNS]
+
+    @staticmethod
+    def overall_standings(standings):
+        if not len(standings):
+            return pd.DataFrame(columns=OVERALL_COLUMNS)
+
+        overall = (
+            standings.assign(
+                Weighted=standings["Percentile"] * standings["Games"]
+            )
+            .groupby("Player", sort=False, observed=True)
+            .agg(
+                Points=("Points", "sum"),
+                Tournaments=("tournament", "nunique"),
+                Games=("Games", "sum"),
+                Wins=("Wins", "sum"),
+                Podiums=("Podiums", "sum"),
+                Weighted=("Weighted", "sum"),
+                BestRank=("BestRank", "min"),
+                Avatar=("Avatar", "max"),
+            )
+            .reset_index()
+        )
+        overall["Percentile"] = overall.pop("Weighted") / overall["Games"]
+        return overall[OVERALL_COLUMNS]
+
+    @staticmethod
+    def personal_bests(results):
+        if not len(results):
+            return pd.DataFrame(columns=BESTS_COLUMNS)
+
+        df = results[results["Player"].str.strip() != ""]
+        return (
+            df.sort_values("Score", ascending=False, kind="stable")
+            .drop_duplicates(["game", "Player"])
+            .sort_values(["game", "Score"], ascending=[True, False])
+            .astype({"tournament": np.int64, "Score": np.int64})[
+                BESTS_COLUMNS
+            ]
+            .reset_index(drop=True)
+        )
+
+    @staticmethod
+    def ranked(df):
+        df = df.sort_values(
+            ["Points", "Wins", "Percentile"], ascending=False, kind="stable"
+        ).reset_index(drop=True)
+        df.insert(0, "Rank", np.arange(1, len(df) + 1))
+        df["Percentile"] = df["Percentile"].round(1)
+        return df
+
+    @staticmethod
+    @timed("rankings.rebuild")
+    def rebuild(storage):
+        results = storage.select_results(columns=RESULT_COLUMNS)
+        for key in (STANDINGS_KEY, BESTS_KEY):
+            storage.remove(key)
+        storage.append(
+            STANDINGS_KEY,
+            Rankings.tournament_standings(results),
+            data_columns=["tournament", "Player"],
+            min_itemsize=STANDINGS_ITEMSIZE,
+        )
+        storage.append(
+            BESTS_KEY,
+            Rankings.personal_bests(results),
+            data_columns=["game", "Player", "tournament"],
+            min_itemsize=BESTS_ITEMSIZE,
+        )
+        Rankings.update_overall(storage)
+
+    @staticmethod
+    @timed("rankings.update")
+    def update(storage, tournaments):
+        if STANDINGS_KEY not in storage or BESTS_KEY not in storage:
+            Rankings.rebuild(storage)
+            return
+
+        tournaments = sorted({int(tournament) for tournament in tournaments})
+        if not tournaments:
+            return
+        where = "tournament == %r" % tournaments
+
+        results = storage.select_results(where, RESULT_COLUMNS)
+        storage.remove(STANDINGS_KEY, where=where)
+        storage.append(
+            STANDINGS_KEY,
+            Rankings.tournament_standings(results),
+            data_columns=["tournament", "Player"],
+            min_itemsize=STANDINGS_ITEMSIZE,
+        )
+
+        games = set(results["game"]) if len(results) else set()
+        old = storage.select(BESTS_KEY, where=where, columns=["game"])
+        if len(old):
+            games.update(old["game"])
+        if games:
+            where = "game == %r" % sorted(games)
+            storage.remove(BESTS_KEY, where=where)
+            storage.append(
+                BESTS_KEY,
+                Rankings.personal_bests(
+                    storage.select_results(where, RESULT_COLUMNS)
+                ),
+                data_columns=["game", "Player", "tournament"],
+                min_itemsize=BESTS_ITEMSIZE,
+            )
+
+        Rankings.update_overall(storage)
+
+    @staticmethod
+    def ensure(storage):
+        if OVERALL_KEY not in storage and "results" in storage:
+            Rankings.rebuild(storage)
+
+    @staticmethod
+    def update_overall(storage):
+        storage.put(
+            OVERALL_KEY,
+            Rankings.ranked(
+                Rankings.overall_standings(storage.select(STANDINGS_KEY))
+            ),
+        )
+
+    @staticmethod
+    def get_overall(storage):
+        return storage.select(OVERALL_KEY)
+
+    @staticmethod
+    def get_tournament(storage, tournament):
+        df = storage.select(
+            STANDINGS_KEY, where="tournament == %d" % int(tournament)
+        )
+        if not len(df):
+            return df
+        return Rankings.ranked(df.drop(columns=["tournament"]))
+
+    @staticmethod
+    def get_tournaments(storage):
+        df = storage.select(STANDINGS_KEY, columns=["tournament"])
+        if not len(df):
+            return []
+        return sorted(df["tournament"].unique().tolist(), reverse=True)
+
+    @staticmethod
+    def get_bests(storage, game):
+        df = storage.select(BESTS_KEY, where="game == %r" % str(game))
+        if not len(df):
+            return df
+        return df.sort_values("Score", ascending=False).reset_index(drop=True)
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from uuid import uuid4
+
+from .asset_cache import CHUNK_SIZE, AssetCache
+from .http_session import get_client
+
+REPLAY_WORKERS = 2
+PREFETCH_WORKERS = 1
+
+
+class HashingWriter:
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+
+
+class ReplayCache:
+    def __init__(self, cache_dir):
+        self.inputs_dir = Path(cache_dir) / "replays"
+        self.refs_dir = self.inputs_dir / "refs"
+        self.refs_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self.pending = {}
+        self.prefetches = set()
+        self.executor = ThreadPoolExecutor(max_workers=REPLAY_WORKERS)
+        self.prefetcher = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+
+    def get(self, url):
+        ref = self.refs_dir / AssetCache.url_key(url)
+        try:
+            inp = self.inputs_dir / ref.read_text().strip()
+        except OSError:
+            return None
+        return inp if inp.exists() else None
+
+    def fetch(self, url):
+        inp = self.get(url)
+        if inp:
+            return inp
+        return self.submit(url).result()
+
+    def prefetch(self, urls):
+        urls = list(dict.fromkeys(url for url in urls if url))
+        with self.lock:
+            for url, future in list(self.pending.items()):
+                if future in self.prefetches and url not in urls:
+                    future.cancel()
+            for url in urls:
+                if url not in self.pending and not self.get(url):
+                    self.start(url, self.prefetcher)
+
+    def submit(self, url):
+        with self.lock:
+            future = self.pending.get(url)
+            if future in self.prefetches and future.cancel():
+                future = None
+            if future is None:
+                future = self.start(url, self.executor)
+            return future
+
+    def start(self, url, executor):
+        future = executor.submit(self.download, url)
+        self.pending[url] = future
+        if executor is self.prefetcher:
+            self.prefetches.add(future)
+        future.add_done_callback(lambda future: self.done(url, future))
+        return future
+
+    def done(self, url, future):
+        with self.lock:
+            self.prefetches.discard(future)
+            if self.pending.get(url) is future:
+                del self.pending[url]
+
+    def download(self, url):
+        zip_part = self.inputs_dir / ("%s.zip.part" % uuid4())
+        inp_part = self.inputs_dir / ("%s.inp.part" % uuid4())
+        try:
+            with get_client().get(url, stream=True) as r:
+                r.raise_for_status()
+                with zip_part.open("wb") as f:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+
+            with zipfile.ZipFile(zip_part) as z:
+                member = next(
+                    (
+                        name
+                        for name in z.namelist()
+                        if name.lower().endswith(".inp")
+                    ),
+                    z.namelist()[0],
+                )
+                with z.open(member) as source, inp_part.open("wb") as f:
+                    writer = HashingWriter(f)
+                    shutil.copyfileobj(source, writer, CHUNK_SIZE)
+
+            inp = self.inputs_dir / (writer.digest.hexdigest() + ".inp")
+            os.replace(inp_part, inp)
+            (self.refs_dir / AssetCache.url_key(url)).write_text(inp.name)
+        finally:
+            zip_part.unlink(missing_ok=True)
+            inp_part.unlink(missing_ok=True)
+
+        return inp
+
+    def close(self):
+        self.prefetcher.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
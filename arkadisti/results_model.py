@@ -1,44 +1,159 @@
-import pandas as pd
-from PySide6.QtCore import QAbstractTableModel, Qt
+import numpy as np
+from PySide6.QtCore import QAbstractTableModel, QSize, Qt
 
-STORE_FILE = "store.h5"
+from .profiler import profiler, timed
+from .storage_manager import StorageManager
+
+AVATAR_SIZE = QSize(24, 24)
+SCREENSHOT_SIZE = QSize(48, 36)
+DECORATIONS = {
+    "Player": ("Avatar", AVATAR_SIZE),
+    "Screenshot": ("Screenshot", SCREENSHOT_SIZE),
+}
+IMAGE_COLUMNS = ("Screenshot",)
 
 
 class ResultsModel(QAbstractTableModel):
     def __init__(self):
         super().__init__()
+        self.storage = StorageManager.instance()
         self.game = None
-        self.reload(self.game)
+        self.tournament = None
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+        self.thumbnails = None
+        self._data = None
+        self._columns = []
+        self._display = []
+        self._keys = []
+        self._decorations = {}
+        self._order = np.arange(0)
 
     def data(self, index, role):
+        if profiler.enabled:
+            profiler.count("results_model.data")
         if role == Qt.DisplayRole:
-            value = self._data.iloc[index.row(), index.column()]
-            return str(value)
+            return self._display[index.column()][self._order[index.row()]]
+        if role == Qt.DecorationRole and self.thumbnails:
+            decoration = self._decorations.get(index.column())
+            if decoration:
+                urls, size = decoration
+                url = urls[self._order[index.row()]]
+                return self.thumbnails.get(url, size)
+
+    def set_thumbnails(self, thumbnails):
+        self.thumbnails = thumbnails
+        self.thumbnails.ready.connect(self.thumbnail_ready)
+
+    def thumbnail_ready(self, _url):
+        for column in self._decorations:
+            self.dataChanged.emit(
+                self.index(0, column),
+                self.index(len(self._order) - 1, column),
+                [Qt.DecorationRole],
+            )
 
     def rowCount(self, index):
-        return self._data.shape[0]
+        return len(self._order)
 
     def columnCount(self, index):
-        return self._data.shape[1]
+        return len(self._columns)
 
     def headerData(self, section, orientation, role):
         # section is the index of the column/row.
         if role == Qt.ItemDataRole.DisplayRole:
             if orientation == Qt.Orientation.Horizontal:
-                return str(self._data.columns[section])
+                return self._columns[section]
 
             if orientation == Qt.Orientation.Vertical:
-                return str(self._data.index[section])
+                return str(self._data.index[self._order[section]])
 
-    def reload(self, game):
-        self.beginResetModel()
+    @timed("results_model.sort")
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        if column < 0 or column >= len(self._columns):
+            return
+
+        self.layoutAboutToBeChanged.emit()
+
+        persistent = self.persistentIndexList()
+        rows = [self._order[index.row()] for index in persistent]
+
+        self._order = self.sorted_order(column, order)
 
-        with pd.HDFStore(STORE_FILE) as store:
-            if game and game in store:
-                self._data = store[game]
+        positions = np.empty_like(self._order)
+        positions[self._order] = np.arange(len(self._order))
+        self.changePersistentIndexList(
+            persistent,
+            [
+                self.index(int(positions[row]), index.column())
+                for row, index in zip(rows, persistent, strict=True)
+            ],
+        )
 
+        self.layoutChanged.emit()
+
+    def sorted_order(self, column, order):
+        indices = np.argsort(self._keys[column], kind="stable")
+        if order == Qt.DescendingOrder:
+            indices = indices[::-1]
+        return indices
+
+    def set_data(self, df):
+        self._data = df
+        self._columns = [str(column) for column in df.columns]
+        self._display = []
+        self._keys = []
+        self._decorations = {}
+        for position, column in enumerate(df.columns):
+            if df[column].dtype.name == "category":
+                display, key = self.decode(df[column])
             else:
-                self._data = pd.DataFrame()
-            store.close()
+                values = df[column].to_numpy()
+                display = df[column].astype(str).to_numpy(dtype=object)
+                if values.dtype.kind in "biuf":
+                    key = values
+                else:
+                    key = np.char.lower(display.astype(str))
+            if column in IMAGE_COLUMNS:
+                self._display.append(np.full(len(df), "", dtype=object))
+            else:
+                self._display.append(display)
+            if column in DECORATIONS:
+                source, size = DECORATIONS[column]
+                if source in df.columns:
+                    self._decorations[position] = (
+                        df[source].to_numpy(dtype=object),
+                        size,
+                    )
+            self._keys.append(key)
+        self._order = np.arange(len(df))
+        if 0 <= self.sort_column < len(self._columns):
+            self._order = self.sorted_order(self.sort_column, self.sort_order)
+
+    @staticmethod
+    def decode(column):
+        categories = np.append(
+            column.cat.categories.astype(str).to_numpy(dtype=object), ""
+        )
+        codes = column.cat.codes.to_numpy()
+        ranks = np.empty(len(categories), dtype=np.int64)
+        ranks[
+            np.argsort(np.char.lower(categories.astype(str)), kind="stable")
+        ] = np.arange(len(categories))
+        return categories[codes], ranks[codes]
 
+    @timed("results_model.reload")
+    def reload(self, game, tournament=None):
+        self.beginResetModel()
+        self.game = game
+        self.tournament = tournament
+        self.set_data(self.storage.get_results(game, tournament))
         self.endResetModel()
+
+    def get_results(self):
+        return self._data
+
+    def get_row(self, row):
+        return self._data.iloc[self._order[row]]
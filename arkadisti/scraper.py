@@ -1,55 +1,112 @@
+import multiprocessing
+import os
 import re
-from io import StringIO
-
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+
+import lxml.html
+import numpy as np
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from PySide6.QtCore import Signal
+
+from .changes import HISTORY_KEYS, Changes
+from .http_session import POOL_SIZE, get_client
+from .player_index import PlayerIndex
+from .profiler import capture, profiler, timed
+from .rankings import Rankings
+from .storage_manager import RESULTS_KEY, StorageManager
 
 API_URL = "https://hrynehrajeme.cz/wp-json/wp/v2/posts/"
-STORE_FILE = "store.h5"
+POST_FIELDS = "id,slug,modified,content"
+INDEX_FIELDS = "id,slug,modified"
+POSTS_PER_PAGE = 100
+FETCH_WORKERS = POOL_SIZE
 
+SLUG_PATTERN = re.compile(r"hrynehrajeme-arcade-turnaj-(\d+)")
+ROM_PATTERN = re.compile(r"(.+) ROM:\s*([a-zA-Z0-9_]+)")
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+NON_DIGITS = re.compile(r"\D+")
+DATE_HEADERS = ("date", "datum", "čas", "time")
+AVATAR_CLASS = "avatar avatar-32 photo wpat-avatar"
+GAMES_CATEGORIES = ("method", "action", "round")
 
-class Scraper:
-    progress = Signal(int)
 
+class Scraper:
     @staticmethod
-    def get_newest():
-        response = requests.get(API_URL)
+    @timed("scraper.fetch_page")
+    def fetch_page(page, fields=POST_FIELDS):
+        response = get_client().get_cached(
+            API_URL,
+            params={
+                "per_page": POSTS_PER_PAGE,
+                "page": page,
+                "_fields": fields,
+            },
+            stale_while_revalidate=0,
+            stale_if_error=False,
+        )
         response.raise_for_status()
+        return response
 
-        posts = response.json()
-
-        pattern = re.compile(r"hrynehrajeme-arcade-turnaj-(\d+)")
-
-        newest = None
-        newest_num = -1
-
-        for post in posts:
-            slug = post.get("slug", "")
-            match = pattern.fullmatch(slug)
-            if match:
-                num = int(match.group(1))
-                if num > newest_num:
-                    newest_num = num
-                    newest = post
-
-        return newest
+    @staticmethod
+    def fetch_posts(fields=POST_FIELDS, workers=FETCH_WORKERS, cancel=None):
+        def fetch(page):
+            if cancel and cancel.is_set():
+                return []
+            return Scraper.fetch_page(page, fields).json()
+
+        first = Scraper.fetch_page(1, fields)
+        posts = first.json()
+
+        total_pages = int(first.headers.get("X-WP-TotalPages", 1))
+        if total_pages > 1:
+            pages = range(2, total_pages + 1)
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(workers, len(pages)))
+            ) as executor:
+                for page_posts in executor.map(fetch, pages):
+                    posts.extend(page_posts)
+
+        return posts
 
     @staticmethod
-    def get_all():
-        response = requests.get(API_URL)
+    @timed("scraper.fetch_post")
+    def fetch_post(post_id, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        response = get_client().get(
+            f"{API_URL}{post_id}",
+            params={"_fields": POST_FIELDS},
+            headers=headers,
+        )
+        if response.status_code == 304:
+            return None, etag
         response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
 
-        posts = response.json()
-
-        pattern = re.compile(r"hrynehrajeme-arcade-turnaj-(\d+)")
+    @staticmethod
+    def fetch_changed(index, state, rounds, cancel=None):
+        def fetch(round):
+            if cancel and cancel.is_set():
+                return None, None
+            return Scraper.fetch_post(
+                index[round]["id"],
+                state[round][2] if round in state else None,
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(FETCH_WORKERS, len(rounds)))
+        ) as executor:
+            return dict(zip(rounds, executor.map(fetch, rounds), strict=True))
 
+    @staticmethod
+    def get_tournaments(posts):
         posts_result = {}
 
         for post in posts:
             slug = post.get("slug", "")
-            match = pattern.fullmatch(slug)
+            match = SLUG_PATTERN.fullmatch(slug)
             if match:
                 round = match.group(1)
                 posts_result[round] = post
@@ -57,121 +114,391 @@ class Scraper:
         return posts_result
 
     @staticmethod
-    def get_rom_names(content):
-        soup = BeautifulSoup(content, "html.parser")
+    @timed("scraper.get_index")
+    def get_index(cancel=None):
+        return Scraper.get_tournaments(
+            Scraper.fetch_posts(INDEX_FIELDS, cancel=cancel)
+        )
 
-        roms = []
+    @staticmethod
+    def get_newest():
+        newest = None
+        newest_num = -1
 
-        for h3 in soup.find_all("h3"):
-            text = h3.get_text(strip=True)
-            match = re.search(r"(.+) ROM:\s*([a-zA-Z0-9_]+)", text)
-            if match:
-                name = match.group(1)
-                rom = match.group(2)
-                tournament_id = None
-                method = None
-                action = None
-                h4 = h3.find_next("h4")
-                if h4:
-                    form = h4.find_next("form")
-                    tournament_input = form.find(
-                        "input", {"name": "tournament_id"}
-                    )
-                    tournament_id = (
+        for round, post in Scraper.get_all().items():
+            num = int(round)
+            if num > newest_num:
+                newest_num = num
+                newest = post
+
+        return newest
+
+    @staticmethod
+    def get_all(cancel=None):
+        return Scraper.get_tournaments(Scraper.fetch_posts(cancel=cancel))
+
+    @staticmethod
+    @timed("scraper.parse_post")
+    def parse_post(content):
+        root = lxml.html.fragment_fromstring(content, create_parent="div")
+
+        roms = []
+        rom_headings = []
+        headings = {}
+        pending_headings = []
+        pending_roms = []
+        pending_forms = []
+
+        for element in root.iter(*HEADING_TAGS, "table", "form"):
+            if element.tag == "table":
+                for heading in pending_headings:
+                    headings.setdefault(heading, element)
+                pending_headings = []
+            elif element.tag == "form":
+                tournament_input = element.find(
+                    ".//input[@name='tournament_id']"
+                )
+                for rom in pending_forms:
+                    rom[2] = (
                         tournament_input.get("value")
-                        if tournament_input
+                        if tournament_input is not None
                         else None
                     )
-                    method = form.get("method")
-                    action = form.get("action")
-                roms.append([rom, name, tournament_id, method, action])
+                    rom[3] = element.get("method")
+                    rom[4] = element.get("action")
+                pending_forms = []
+            else:
+                text = element.text_content().strip()
+                pending_headings.append(text)
+                if element.tag == "h4":
+                    pending_forms = pending_forms + pending_roms
+                    pending_roms = []
+                elif element.tag == "h3":
+                    match = ROM_PATTERN.search(text)
+                    if match:
+                        rom = [match.group(2), match.group(1)]
+                        rom = rom + [None, None, None]
+                        roms.append(rom)
+                        rom_headings.append((rom[0], text))
+                        pending_roms.append(rom)
+
+        tables = {}
+        for game, text in rom_headings:
+            table = headings.get(text)
+            if table is not None:
+                tables.setdefault(game, table)
+
+        return roms, tables
 
+    @staticmethod
+    def get_rom_names(content):
+        roms, _tables = Scraper.parse_post(content)
         return roms
 
     @staticmethod
     def scrape_table(content, game):
-        soup = BeautifulSoup(content, "html.parser")
-
-        tables = soup.find_all("table")
-
-        target_tables = []
-
-        for table in tables:
-            found = False
-            for sibling in table.find_previous_siblings():
-                if sibling.name in ["h1", "h2", "h3", "h4", "h5", "h6"]:
-                    text = sibling.get_text(strip=True)
-                    if game in text:
-                        found = True
-                        break
-            if found:
-                target_tables.append(table)
-
-        if not target_tables:
+        _roms, tables = Scraper.parse_post(content)
+        if game not in tables:
             return None
+        return Scraper.table_frame(tables[game])
 
-        target_table = target_tables[0]
+    @staticmethod
+    def header_columns(header):
+        columns = []
+        for position, text in enumerate(header):
+            name = text.lower()
+            if "score" in name or "skóre" in name:
+                column = "Score"
+            elif any(word in name for word in DATE_HEADERS):
+                column = "Date"
+            elif position == 0:
+                column = "Rank"
+            elif position == 1:
+                column = "Player"
+            else:
+                column = None
+            columns.append(column if column not in columns else None)
+        return columns
 
-        df = pd.read_html(StringIO(str(target_table)))[0]
+    @staticmethod
+    def to_int(value, default=0):
+        digits = NON_DIGITS.sub("", value)
+        return int(digits) if digits else default
 
-        pd.options.mode.copy_on_write = True
+    @staticmethod
+    @timed("scraper.table_frame")
+    def table_frame(table):
+        columns = None
+        texts = {}
+        avatar_urls = []
+        input_urls = []
+        screenshot_urls = []
 
-        df["Score"] = (
-            df["Score"]
-            .astype(str)
-            .str.replace(r"\D+", "", regex=True)
-            .astype(int)
-        )
+        for row in table.iter("tr"):
+            cells = [cell for cell in row if cell.tag in ("td", "th")]
+            if columns is None:
+                columns = Scraper.header_columns(
+                    [cell.text_content().strip() for cell in cells]
+                )
+                texts = {name: [] for name in columns if name}
+                continue
+            if row.find("td") is None:
+                continue
+
+            for position, name in enumerate(columns):
+                if name:
+                    texts[name].append(
+                        cells[position].text_content().strip()
+                        if position < len(cells)
+                        else ""
+                    )
 
-        df = df.drop(columns=["Screenshot", "INP"])
+            avatar = input = screenshot = ""
+            for element in row.iter("img", "a"):
+                if element.tag == "img":
+                    if not avatar and element.get("class") == AVATAR_CLASS:
+                        avatar = element.get("src", "")
+                    continue
+                href = element.get("href", "")
+                if not input and href.lower().endswith(".zip"):
+                    input = href
+                elif not screenshot and href.lower().endswith(".png"):
+                    screenshot = href
+            avatar_urls.append(avatar)
+            input_urls.append(input)
+            screenshot_urls.append(screenshot)
+
+        rows = len(avatar_urls)
+        data = {
+            "Rank": np.array(
+                [
+                    Scraper.to_int(value, position + 1)
+                    for position, value in enumerate(
+                        texts.get("Rank", [""] * rows)
+                    )
+                ],
+                dtype=np.int64,
+            ),
+            "Player": np.array(
+                texts.get("Player", [""] * rows), dtype=object
+            ),
+            "Score": np.array(
+                [
+                    Scraper.to_int(value)
+                    for value in texts.get("Score", [""] * rows)
+                ],
+                dtype=np.int64,
+            ),
+            "Date": np.array(texts.get("Date", [""] * rows), dtype=object),
+            "Avatar": np.array(avatar_urls, dtype=object),
+            "Input": np.array(input_urls, dtype=object),
+            "Screenshot": np.array(screenshot_urls, dtype=object),
+        }
+
+        return pd.DataFrame(data)
 
-        avatar_urls = []
-        for row in target_table.find_all("tr"):
-            img = row.find("img", class_="avatar avatar-32 photo wpat-avatar")
-            if img and img.get("src"):
-                avatar_urls.append(img["src"])
-        df["Avatar"] = avatar_urls
+    @staticmethod
+    def scrape_post(content):
+        roms, tables = Scraper.parse_post(content)
+        frames = {
+            rom: Scraper.table_frame(table) for rom, table in tables.items()
+        }
+        return roms, frames
 
-        input_urls = []
-        for row in target_table.find_all("tr"):
-            all = row.find_all("a", href=True)
-            for a in all:
-                if a and a.get("href").lower().endswith(".zip"):
-                    input_urls.append(a.get("href"))
-        df["Input"] = input_urls
+    @staticmethod
+    def games_frame(games):
+        games_df = pd.DataFrame(
+            games,
+            columns=[
+                "games",
+                "name",
+                "tournament_id",
+                "method",
+                "action",
+                "round",
+            ],
+        )
+        for column in games_df.columns:
+            games_df[column] = games_df[column].astype(
+                "category" if column in GAMES_CATEGORIES else "string"
+            )
+        return games_df
 
-        screenshot_urls = []
-        for row in target_table.find_all("tr"):
-            all = row.find_all("a", href=True)
-            for a in all:
-                if a and a.get("href").lower().endswith(".png"):
-                    screenshot_urls.append(a.get("href"))
-        df["Screenshot"] = screenshot_urls
+    @staticmethod
+    def sync_frame(state):
+        return pd.DataFrame.from_dict(
+            state,
+            orient="index",
+            columns=["id", "modified", "etag"],
+            dtype="string",
+        ).rename_axis("round")
 
-        return df
+    @staticmethod
+    def parse_posts(contents, workers=None):
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(contents) <= 1:
+            for round, content in contents.items():
+                yield round, *Scraper.scrape_post(content)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(contents)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = {
+                (
+                    executor.submit(capture, Scraper.scrape_post, content)
+                    if profiler.enabled
+                    else executor.submit(Scraper.scrape_post, content)
+                ): round
+                for round, content in contents.items()
+            }
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    if profiler.enabled:
+                        result, events = result
+                        profiler.merge(events)
+                    yield futures[future], *result
+            finally:
+                executor.shutdown(cancel_futures=True)
 
     @staticmethod
-    def download():
+    def write_posts(
+        storage, contents, workers=None, progress=None, cancel=None
+    ):
+        games = {}
+        for round, roms, frames in Scraper.parse_posts(contents, workers):
+            if cancel and cancel.is_set():
+                break
+            storage.put_results(round, frames)
+            games[round] = [rom + [round] for rom in roms]
+            if progress:
+                progress(len(games), len(contents))
+        return {round: games[round] for round in contents if round in games}
 
-        games = []
+    @staticmethod
+    @timed("scraper.download")
+    def download(
+        incremental=True,
+        workers=None,
+        progress=None,
+        cancel=None,
+        storage=None,
+    ):
+        if storage is None:
+            storage = StorageManager.instance()
+        try:
+            if (
+                incremental
+                and all(
+                    key in storage for key in ("sync", "games", RESULTS_KEY)
+                )
+                and storage.results_encoded()
+            ):
+                return Scraper.download_changed(
+                    storage, workers, progress, cancel
+                )
+            return Scraper.download_all(storage, workers, progress, cancel)
+        finally:
+            storage.flush()
 
-        store = pd.HDFStore(STORE_FILE, mode="w")
+    @staticmethod
+    def download_all(storage, workers=None, progress=None, cancel=None):
+        all = Scraper.get_all(cancel)
+        if cancel and cancel.is_set():
+            return 0
+
+        for key in storage.keys():
+            if key.strip("/") not in HISTORY_KEYS:
+                storage.remove(key)
+        written = Scraper.write_posts(
+            storage,
+            {round: a["content"]["rendered"] for round, a in all.items()},
+            workers,
+            progress,
+            cancel,
+        )
+        games = [rom for roms in written.values() for rom in roms]
+        state = {
+            round: [str(all[round]["id"]), all[round]["modified"], None]
+            for round in written
+        }
+        storage.put("games", Scraper.games_frame(games))
+        storage.put("sync", Scraper.sync_frame(state))
+        storage.index_results()
+        Rankings.rebuild(storage)
+        PlayerIndex.rebuild(storage)
+        Changes.prune(storage, all)
+        Changes.record(storage, written)
+
+        return len(written)
 
-        all = Scraper.get_all()
-        for _k, a in all.items():
-            roms = Scraper.get_rom_names(a["content"]["rendered"])
-            games = games + roms
-            for rom in roms:
-                df = Scraper.scrape_table(a["content"]["rendered"], rom[0])
-                store[rom[0]] = df
-        games_df = pd.DataFrame(
-            games,
-            columns=["games", "name", "tournament_id", "method", "action"],
+    @staticmethod
+    def download_changed(storage, workers=None, progress=None, cancel=None):
+        state = {
+            round: [
+                row.id,
+                row.modified,
+                row.etag if pd.notna(row.etag) else None,
+            ]
+            for round, row in storage.get("sync").iterrows()
+        }
+
+        index = Scraper.get_index(cancel)
+        if cancel and cancel.is_set():
+            return 0
+        removed = set(state) - set(index)
+        changed = [
+            round
+            for round, post in index.items()
+            if round not in state or state[round][1] != post["modified"]
+        ]
+        if not changed and not removed:
+            return 0
+
+        fetched = Scraper.fetch_changed(index, state, changed, cancel)
+        if cancel and cancel.is_set():
+            return 0
+        contents = {
+            round: post["content"]["rendered"]
+            for round, (post, _etag) in fetched.items()
+            if post
+        }
+        replaced = set(contents) | removed
+
+        games_df = storage.get("games")
+        kept = {
+            round: rows.values.tolist()
+            for round, rows in games_df.loc[
+                ~games_df["round"].isin(replaced)
+            ].groupby("round", sort=False, observed=True)
+        }
+        for round in replaced:
+            storage.remove_results(round)
+        written = Scraper.write_posts(
+            storage, contents, workers, progress, cancel
         )
-        games_df["tournament_id"] = games_df["tournament_id"].astype("string")
-        games_df["games"] = games_df["games"].astype("string")
-        games_df["name"] = games_df["name"].astype("string")
-        games_df["method"] = games_df["method"].astype("string")
-        games_df["action"] = games_df["action"].astype("string")
-        store["games"] = games_df
-        store.close()
+        kept.update(written)
+        games = [
+            rom for round in index if round in kept for rom in kept[round]
+        ]
+
+        for round, (post, etag) in fetched.items():
+            if round in contents and round not in written:
+                state.pop(round, None)
+                continue
+            modified = post["modified"] if post else index[round]["modified"]
+            state[round] = [str(index[round]["id"]), modified, etag]
+        for round in removed:
+            del state[round]
+
+        if replaced:
+            storage.put("games", Scraper.games_frame(games))
+            storage.index_results()
+            Rankings.update(storage, replaced)
+            PlayerIndex.update(storage, replaced)
+            Changes.record(storage, replaced)
+        storage.put("sync", Scraper.sync_frame(state))
+
+        return len(replaced)
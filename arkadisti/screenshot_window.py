@@ -2,13 +2,22 @@ import os
 from pathlib import Path
 
 from PySide6.QtCore import QModelIndex, Qt
-from PySide6.QtGui import QIcon, QPixmap
-from PySide6.QtWidgets import QDialog, QFileSystemModel
+from PySide6.QtGui import (
+    QIcon,
+    QImageReader,
+    QPixmap,
+    QStandardItem,
+    QStandardItemModel,
+)
+from PySide6.QtWidgets import QDialog
 
 from .config_manager import ConfigManager
 from .res import rc_arkadisti  # noqa: F401
+from .thumbnail_loader import SnapshotThumbnailLoader
 from .ui.ui_screenshot_window import Ui_ScreenshotWindow
 
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".gif")
+
 
 class ScreenshotWindow(QDialog):
     def __init__(self, game):
@@ -32,36 +41,80 @@ class ScreenshotWindow(QDialog):
         icon = QIcon(":/icons/arkadisti.svg")
         self.setWindowIcon(icon)
 
-        self.model = QFileSystemModel()
-        self.model.setRootPath(str(snap_dir))
-        self.model.setNameFilters(
-            ["*.png", "*.jpg", "*.jpeg", "*.bmp", "*.gif"]
+        self.thumbnails = SnapshotThumbnailLoader(
+            self.config.get_cache_dir(), self.ui.imageView.iconSize(), self
+        )
+        self.thumbnails.loaded.connect(self.update_thumbnail)
+
+        self.model = QStandardItemModel(self)
+        self.items = {}
+
+        self.ui.imageView.setModel(self.model)
+        self.ui.imageView.clicked.connect(self.update_preview)
+        self.ui.imageView.selectionModel().currentChanged.connect(
+            self.update_preview
         )
-        self.model.setNameFilterDisables(False)
 
         if snap_dir.exists():
-            self.ui.imageView.setModel(self.model)
-            self.ui.imageView.setRootIndex(self.model.index(str(snap_dir)))
-            self.ui.imageView.setUniformItemSizes(True)
-            self.ui.imageView.clicked.connect(self.update_preview)
-            self.ui.imageView.selectionModel().currentChanged.connect(
-                self.update_preview
+            self.load_snapshots(snap_dir)
+
+    def load_snapshots(self, snap_dir):
+        with os.scandir(snap_dir) as entries:
+            snapshots = sorted(
+                (
+                    (entry.stat().st_mtime_ns, entry.path, entry.name)
+                    for entry in entries
+                    if entry.is_file()
+                    and entry.name.lower().endswith(IMAGE_SUFFIXES)
+                ),
+                reverse=True,
             )
 
+        for mtime, path, name in snapshots:
+            item = QStandardItem(name)
+            item.setData(path, Qt.UserRole)
+            item.setEditable(False)
+            self.model.appendRow(item)
+            self.items[path] = item
+            self.thumbnails.request(path, mtime)
+
+        if snapshots:
+            self.ui.imageView.setCurrentIndex(self.model.index(0, 0))
+
+    def update_thumbnail(self, path, image):
+        item = self.items.get(path)
+        if item and not image.isNull():
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
     def accept(self):
+        self.thumbnails.cancel()
         if self.current:
             self.result_data = Path(self.current)
         else:
             self.result_data = self.current
         super().accept()
 
+    def reject(self):
+        self.thumbnails.cancel()
+        super().reject()
+
     def update_preview(self, current: QModelIndex, *_):
-        file_path = self.model.filePath(current)
+        file_path = current.data(Qt.UserRole)
         self.current = file_path
-        if os.path.isfile(file_path):
-            pixmap = QPixmap(file_path)
-            if not pixmap.isNull():
-                self.ui.imageLabel.setPixmap(pixmap)
+        if file_path and os.path.isfile(file_path):
+            reader = QImageReader(file_path)
+            size = reader.size()
+            label_size = self.ui.imageLabel.size()
+            if (
+                size.width() > label_size.width()
+                or size.height() > label_size.height()
+            ):
+                reader.setScaledSize(
+                    size.scaled(label_size, Qt.KeepAspectRatio)
+                )
+            image = reader.read()
+            if not image.isNull():
+                self.ui.imageLabel.setPixmap(QPixmap.fromImage(image))
             else:
                 self.ui.imageLabel.setText("Nemohu načíst obrázek")
         else:
@@ -14,6 +14,18 @@ LABELS = {
     "inp_dir": "inp_dir",
     "snap_dir": "snap_dir",
     "output_dir": "output_dir",
+    "sync_workers": "sync_workers",
+    "cache_dir": "cache_dir",
+    "asset_cache_mb": "asset_cache_mb",
+    "package_compression": "package_compression",
+    "package_level": "package_level",
+    "package_screenshot": "package_screenshot",
+    "package_manifest": "package_manifest",
+    "package_workers": "package_workers",
+    "http_max_age": "http_max_age",
+    "http_stale_while_revalidate": "http_stale_while_revalidate",
+    "profile": "profile",
+    "profile_trace": "profile_trace",
 }
 
 CONFIG_FILE = "settings.ini"
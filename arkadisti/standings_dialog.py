@@ -0,0 +1,65 @@
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QComboBox, QDialog, QTableView, QVBoxLayout
+
+from .rankings import Rankings
+from .results_model import AVATAR_SIZE, ResultsModel
+
+OVERALL = "overall"
+TOURNAMENT = "tournament"
+BESTS = "bests"
+
+
+class StandingsDialog(QDialog):
+    def __init__(self, storage, thumbnails=None, game=None, parent=None):
+        super().__init__(parent)
+
+        self.setWindowTitle("Pořadí")
+        self.resize(640, 480)
+
+        self.storage = storage
+        Rankings.ensure(storage)
+
+        layout = QVBoxLayout(self)
+
+        self.combo = QComboBox()
+        self.combo.addItem("Celkově", (OVERALL, None))
+        if game:
+            self.combo.addItem("Osobní rekordy: %s" % game, (BESTS, game))
+        for tournament in Rankings.get_tournaments(storage):
+            self.combo.addItem(
+                "Turnaj %d" % tournament, (TOURNAMENT, tournament)
+            )
+        self.combo.currentIndexChanged.connect(self.reload)
+        layout.addWidget(self.combo)
+
+        self.model = ResultsModel()
+        if thumbnails:
+            self.model.set_thumbnails(thumbnails)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setDefaultSectionSize(
+            AVATAR_SIZE.height() + 4
+        )
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+
+        self.reload()
+
+    def reload(self, *_):
+        kind, value = self.combo.currentData()
+        if kind == OVERALL:
+            df = Rankings.get_overall(self.storage)
+        elif kind == BESTS:
+            df = Rankings.get_bests(self.storage, value)
+        else:
+            df = Rankings.get_tournament(self.storage, value)
+
+        self.model.beginResetModel()
+        self.model.sort_column = -1
+        self.model.set_data(df)
+        self.model.endResetModel()
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        for position, column in enumerate(df.columns):
+            self.table.setColumnHidden(position, column == "Avatar")
@@ -1,14 +1,382 @@
-import pandas as pd
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .profiler import profiler, span, timed
 
 STORE_FILE = "store.h5"
+SNAPSHOT_SUFFIX = ".games.json"
+CACHE_SIZE = 128
+
+RESULTS_KEY = "results"
+RESULTS_KEY_COLUMNS = ["tournament", "game"]
+RESULTS_DATA_COLUMNS = ["game", "tournament", "Player"]
+RESULTS_MIN_ITEMSIZE = {"game": 32, "Player": 64, "values": 256}
+URL_COLUMNS = ["Avatar", "Input", "Screenshot"]
+CATEGORY_COLUMNS = ["game", "Player", "Date"]
+PREFIX_SUFFIX = "Prefix"
+PREFIXES_KEY = "prefixes"
 
 
 class StorageManager:
-    def __init__(self):
-        self.store = pd.HDFStore(STORE_FILE)
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path=STORE_FILE, cache_size=CACHE_SIZE):
+        self.path = path
+        self.snapshot_path = Path(path).with_suffix(SNAPSHOT_SUFFIX)
+        self.cache_size = cache_size
+        self.lock = threading.RLock()
+        self.store = None
+        self.games = None
+        self.prefixes = None
+        self.cache = OrderedDict()
+
+    @classmethod
+    def instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def open(self):
+        with self.lock:
+            if self.store is None:
+                import pandas as pd
+
+                with span("storage.open"):
+                    self.store = pd.HDFStore(self.path, mode="a")
+            return self.store
+
+    def close(self):
+        with self.lock:
+            if self.store is not None:
+                self.store.close()
+                self.store = None
+            self.invalidate()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.open()
+
+    def keys(self):
+        with self.lock:
+            return self.open().keys()
+
+    def get(self, key):
+        with self.lock:
+            return self.open()[key]
+
+    @timed("storage.put")
+    def put(self, key, df):
+        with self.lock:
+            self.open().put(key, df, format="table")
+            self.invalidate(key)
+            if key.lstrip("/") == "games":
+                self.write_snapshot(df)
+
+    def remove(self, key, where=None):
+        with self.lock:
+            store = self.open()
+            if key in store:
+                store.remove(key, where=where)
+            self.invalidate(key)
+
+    @timed("storage.append")
+    def append(self, key, df, data_columns=None, min_itemsize=None):
+        with self.lock:
+            if len(df):
+                self.open().append(
+                    key,
+                    self.decoded(df),
+                    format="table",
+                    data_columns=data_columns,
+                    min_itemsize=min_itemsize,
+                    complib="blosc",
+                    complevel=9,
+                )
+            self.invalidate(key)
+
+    @staticmethod
+    def decoded(df):
+        categories = df.select_dtypes("category").columns
+        if not len(categories):
+            return df
+        return df.astype({column: str for column in categories})
+
+    @timed("storage.select")
+    def select(self, key, where=None, columns=None, start=None):
+        import pandas as pd
+
+        with self.lock:
+            store = self.open()
+            if key not in store:
+                return pd.DataFrame()
+            return store.select(
+                key, where=where, columns=columns, start=start
+            )
+
+    def nrows(self, key):
+        with self.lock:
+            store = self.open()
+            if key not in store:
+                return 0
+            return store.get_storer(key).nrows
+
+    def flush(self):
+        with self.lock:
+            if self.store is not None:
+                self.store.flush()
+
+    def invalidate(self, key=None):
+        with self.lock:
+            if key is None:
+                self.cache.clear()
+                self.games = None
+                self.prefixes = None
+            elif key.lstrip("/") == PREFIXES_KEY:
+                self.prefixes = None
+            elif key.lstrip("/") == "games":
+                self.games = None
+            elif key.lstrip("/") == RESULTS_KEY:
+                self.cache.clear()
+
+    def invalidate_tournament(self, tournament):
+        with self.lock:
+            for key in list(self.cache):
+                if key[0] in (None, str(tournament)):
+                    del self.cache[key]
+
+    @timed("storage.put_results")
+    def put_results(self, tournament, frames):
+        import pandas as pd
+
+        with self.lock:
+            self.remove_results(tournament)
+            frames = [
+                df.assign(tournament=int(tournament), game=game)
+                for game, df in frames.items()
+                if len(df)
+            ]
+            if frames:
+                df = self.encode_urls(
+                    self.decoded(pd.concat(frames, ignore_index=True))
+                )
+                columns = RESULTS_KEY_COLUMNS + [
+                    column
+                    for column in df.columns
+                    if column not in RESULTS_KEY_COLUMNS
+                ]
+                self.open().append(
+                    RESULTS_KEY,
+                    df[columns],
+                    format="table",
+                    data_columns=RESULTS_DATA_COLUMNS,
+                    min_itemsize=RESULTS_MIN_ITEMSIZE,
+                    complib="blosc",
+                    complevel=9,
+                    index=False,
+                )
+
+    @timed("storage.remove_results")
+    def remove_results(self, tournament):
+        with self.lock:
+            store = self.open()
+            if RESULTS_KEY in store:
+                store.remove(
+                    RESULTS_KEY, where="tournament == %d" % int(tournament)
+                )
+            self.invalidate_tournament(tournament)
 
-    def get_results(self, game):
-        return self.store[game]
+    @timed("storage.index_results")
+    def index_results(self):
+        self.create_index(RESULTS_KEY, ["game", "tournament"])
+
+    def create_index(self, key, columns):
+        with self.lock:
+            store = self.open()
+            if key in store:
+                store.create_table_index(
+                    key, columns=columns, optlevel=9, kind="full"
+                )
+
+    @timed("storage.select_results")
+    def select_results(self, where=None, columns=None):
+        import pandas as pd
+
+        with self.lock:
+            store = self.open()
+            if RESULTS_KEY not in store:
+                return pd.DataFrame()
+            if columns is not None and self.results_encoded():
+                columns = list(columns) + [
+                    column + PREFIX_SUFFIX
+                    for column in URL_COLUMNS
+                    if column in columns
+                ]
+            return self.decode_results(
+                store.select(RESULTS_KEY, where=where, columns=columns)
+            )
+
+    def results_encoded(self):
+        with self.lock:
+            store = self.open()
+            if RESULTS_KEY not in store:
+                return True
+            columns = store.get_storer(RESULTS_KEY).non_index_axes[0][1]
+            return URL_COLUMNS[0] + PREFIX_SUFFIX in columns
+
+    def get_prefixes(self):
+        with self.lock:
+            if self.prefixes is None:
+                store = self.open()
+                self.prefixes = (
+                    store[PREFIXES_KEY]["prefix"].tolist()
+                    if PREFIXES_KEY in store
+                    else []
+                )
+            return self.prefixes
+
+    def prefix_ids(self, prefixes):
+        import pandas as pd
+
+        with self.lock:
+            vocabulary = self.get_prefixes()
+            ids = {prefix: id for id, prefix in enumerate(vocabulary)}
+            added = [prefix for prefix in prefixes if prefix not in ids]
+            if added:
+                for prefix in added:
+                    ids[prefix] = len(vocabulary)
+                    vocabulary.append(prefix)
+                self.open().put(
+                    PREFIXES_KEY,
+                    pd.DataFrame({"prefix": vocabulary}),
+                    format="table",
+                )
+            return [ids[prefix] for prefix in prefixes]
+
+    def encode_urls(self, df):
+        import numpy as np
+        import pandas as pd
+
+        df = df.copy()
+        for column in URL_COLUMNS:
+            if column not in df:
+                continue
+            parts = df[column].fillna("").astype(str).str.rpartition("/")
+            codes, prefixes = pd.factorize(parts[0] + parts[1])
+            ids = np.asarray(self.prefix_ids(list(prefixes)), dtype=np.int64)
+            df[column] = parts[2]
+            df[column + PREFIX_SUFFIX] = ids[codes]
+        return df
+
+    def decode_results(self, df):
+        import numpy as np
+        import pandas as pd
+
+        for column in URL_COLUMNS:
+            if column + PREFIX_SUFFIX not in df:
+                continue
+            ids = df.pop(column + PREFIX_SUFFIX).to_numpy(dtype=np.int64)
+            codes, suffixes = pd.factorize(df[column])
+            size = max(len(suffixes), 1)
+            pairs, uniques = pd.factorize(ids * size + codes)
+            prefixes = np.array(self.get_prefixes(), dtype=object)
+            df[column] = pd.Categorical.from_codes(
+                pairs,
+                prefixes[uniques // size]
+                + suffixes.to_numpy(dtype=object)[uniques % size],
+            )
+        for column in CATEGORY_COLUMNS:
+            if column in df:
+                df[column] = df[column].astype("category")
+        return df
+
+    @staticmethod
+    def results_key(game, tournament=None):
+        return (None if tournament is None else str(tournament), game)
+
+    def get_results(self, game, tournament=None):
+        key = self.results_key(game, tournament)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                profiler.count("storage.cache_hit")
+                return self.cache[key]
+
+            if not game:
+                import pandas as pd
+
+                return pd.DataFrame()
+
+            where = "game == %r" % str(game)
+            if tournament is not None:
+                where += " & tournament == %d" % int(tournament)
+            df = self.select_results(where)
+            if len(df):
+                df = df.drop(columns=RESULTS_KEY_COLUMNS).reset_index(
+                    drop=True
+                )
+
+            self.cache[key] = df
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return df
+
+    def prefetch(self, keys):
+        for tournament, game in keys:
+            if not self.lock.acquire(blocking=False):
+                return
+            try:
+                key = self.results_key(game, tournament)
+                if game and key not in self.cache:
+                    self.get_results(game, tournament)
+            finally:
+                self.lock.release()
 
     def get_games(self):
-        return self.store["games"]
+        with self.lock:
+            if self.games is None:
+                store = self.open()
+                if "games" in store:
+                    with span("storage.get_games"):
+                        self.games = store["games"]
+                    if not self.snapshot_path.exists():
+                        self.write_snapshot(self.games)
+                else:
+                    import pandas as pd
+
+                    return pd.DataFrame()
+            return self.games
+
+    @staticmethod
+    def snapshot(df):
+        return {
+            "index": [str(value) for value in df.index],
+            "columns": {
+                str(column): [
+                    None if missing else str(value)
+                    for value, missing in zip(
+                        df[column].tolist(),
+                        df[column].isna().tolist(),
+                        strict=True,
+                    )
+                ]
+                for column in df.columns
+            },
+        }
+
+    def get_snapshot(self):
+        try:
+            with self.snapshot_path.open(encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_snapshot(self, df):
+        part = self.snapshot_path.with_suffix(".part")
+        with part.open("w", encoding="utf-8") as f:
+            json.dump(self.snapshot(df), f, ensure_ascii=False)
+        os.replace(part, self.snapshot_path)
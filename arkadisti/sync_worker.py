@@ -0,0 +1,36 @@
+import threading
+
+from PySide6.QtCore import QThread, Signal
+
+
+class SyncWorker(QThread):
+    progress = Signal(int, int)
+    completed = Signal(int)
+    failed = Signal(str)
+
+    def __init__(self, workers=None, incremental=True, parent=None):
+        super().__init__(parent)
+        self.workers = workers
+        self.incremental = incremental
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def run(self):
+        try:
+            from .scraper import Scraper
+
+            changed = Scraper.download(
+                incremental=self.incremental,
+                workers=self.workers,
+                progress=self.progress.emit,
+                cancel=self.cancel_event,
+            )
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.completed.emit(changed)
@@ -0,0 +1,6 @@
+import unicodedata
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    return "".join(char for char in text if not unicodedata.combining(char))
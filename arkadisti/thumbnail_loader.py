@@ -0,0 +1,132 @@
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+
+from PySide6.QtCore import QObject, QRunnable, QSize, Qt, QThreadPool, Signal
+from PySide6.QtGui import QImage, QImageReader, QPixmap
+
+from .asset_cache import AssetCache
+
+THUMBNAIL_CACHE_SIZE = 1024
+THUMBNAIL_WORKERS = 4
+
+
+class ThumbnailJob(QRunnable):
+    def __init__(self, loader, url, size):
+        super().__init__()
+        self.loader = loader
+        self.url = url
+        self.size = size
+
+    def run(self):
+        if self.loader.cancelled:
+            return
+
+        image = QImage()
+        try:
+            blob = self.loader.assets.fetch(self.url)
+        except Exception:
+            blob = None
+        if blob:
+            reader = QImageReader(str(blob))
+            reader.setScaledSize(
+                reader.size().scaled(self.size, Qt.KeepAspectRatio)
+            )
+            image = reader.read()
+        if not self.loader.cancelled:
+            self.loader.loaded.emit(self.url, self.size, image)
+
+
+class ThumbnailLoader(QObject):
+    loaded = Signal(str, QSize, QImage)
+    ready = Signal(str)
+
+    def __init__(self, cache_dir, max_size, parent=None):
+        super().__init__(parent)
+        self.assets = AssetCache(cache_dir, max_size)
+        self.cancelled = False
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(THUMBNAIL_WORKERS)
+        self.pixmaps = OrderedDict()
+        self.pending = set()
+        self.loaded.connect(self.on_loaded)
+
+    def get(self, url, size):
+        if not url:
+            return None
+
+        key = (url, size.width(), size.height())
+        if key in self.pixmaps:
+            self.pixmaps.move_to_end(key)
+            return self.pixmaps[key]
+
+        if key not in self.pending:
+            self.pending.add(key)
+            self.pool.start(ThumbnailJob(self, url, size))
+        return None
+
+    def on_loaded(self, url, size, image):
+        key = (url, size.width(), size.height())
+        self.pending.discard(key)
+        self.pixmaps[key] = (
+            QPixmap.fromImage(image) if not image.isNull() else None
+        )
+        while len(self.pixmaps) > THUMBNAIL_CACHE_SIZE:
+            self.pixmaps.popitem(last=False)
+        self.ready.emit(url)
+
+    def cancel(self):
+        self.cancelled = True
+        self.pool.clear()
+        self.pool.waitForDone()
+
+
+class SnapshotJob(QRunnable):
+    def __init__(self, loader, path, mtime):
+        super().__init__()
+        self.loader = loader
+        self.path = path
+        self.mtime = mtime
+
+    def run(self):
+        if self.loader.cancelled:
+            return
+
+        key = "%s:%d" % (self.path, self.mtime)
+        cached = self.loader.thumbs_dir / (
+            hashlib.sha1(key.encode("utf-8")).hexdigest() + ".png"
+        )
+
+        image = QImage(str(cached)) if cached.exists() else QImage()
+        if image.isNull():
+            reader = QImageReader(str(self.path))
+            reader.setScaledSize(
+                reader.size().scaled(self.loader.size, Qt.KeepAspectRatio)
+            )
+            image = reader.read()
+            part = cached.with_suffix(".part")
+            if not image.isNull() and image.save(str(part), "PNG"):
+                os.replace(part, cached)
+        self.loader.loaded.emit(str(self.path), image)
+
+
+class SnapshotThumbnailLoader(QObject):
+    loaded = Signal(str, QImage)
+
+    def __init__(self, cache_dir, size, parent=None):
+        super().__init__(parent)
+        self.thumbs_dir = Path(cache_dir) / "thumbs"
+        self.thumbs_dir.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.cancelled = False
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(THUMBNAIL_WORKERS)
+
+    def request(self, path, mtime):
+        self.pool.start(SnapshotJob(self, path, mtime))
+
+    def cancel(self):
+        self.cancelled = True
+        self.pool.clear()
+        self.pool.waitForDone()
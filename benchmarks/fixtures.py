@@ -0,0 +1,88 @@
+import random
+
+SLUG = "hrynehrajeme-arcade-turnaj-%d"
+UPLOADS = "https://hrynehrajeme.cz/wp-content/uploads/2025/01/"
+
+
+def rom_name(round, game):
+    return "rom%d_%d" % (round, game)
+
+
+def make_table(round, game, rows, rng):
+    trs = [
+        "<tr><th>#</th><th>Hráč</th><th>Skóre</th><th>Datum</th>"
+        "<th>Screenshot</th><th>INP</th></tr>"
+    ]
+    scores = sorted(
+        (rng.randrange(1000, 10_000_000) for _ in range(rows)),
+        reverse=True,
+    )
+    for rank, score in enumerate(scores, 1):
+        player = rng.randrange(rows * 4)
+        trs.append(
+            "<tr><td>%d.</td>"
+            "<td><img class=\"avatar avatar-32 photo wpat-avatar\" "
+            "src=\"%savatar%d.png\"> Hráč %d</td>"
+            "<td>%s</td><td>2025-01-%02d 20:%02d</td>"
+            "<td><a href=\"%sshot_%d_%d_%d.png\">png</a></td>"
+            "<td><a href=\"%sinp_%d_%d_%d.zip\">zip</a></td></tr>"
+            % (
+                rank,
+                UPLOADS,
+                player,
+                player,
+                "{:,}".format(score).replace(",", " "),
+                rank % 28 + 1,
+                rank % 60,
+                UPLOADS,
+                round,
+                game,
+                rank,
+                UPLOADS,
+                round,
+                game,
+                rank,
+            )
+        )
+    return "<table>%s</table>" % "".join(trs)
+
+
+def make_content(round, games, rows, seed=0):
+    rng = random.Random(seed * 1_000_003 + round)
+    parts = ["<p>Turnaj %d</p>" % round]
+    for game in range(games):
+        rom = rom_name(round, game)
+        parts.append("<h3>Hra %d ROM: %s</h3>" % (game, rom))
+        parts.append(
+            "<h4>Odeslat výsledek</h4>"
+            "<form method=\"post\" action=\"/odeslat/\">"
+            "<input type=\"hidden\" name=\"tournament_id\" value=\"%d\">"
+            "</form>" % (round * 100 + game)
+        )
+        parts.append("<h4>Výsledky %s</h4>" % rom)
+        parts.append(make_table(round, game, rows, rng))
+    return "".join(parts)
+
+
+def make_posts(tournaments, games, rows, seed=0):
+    posts = []
+    for round in range(1, tournaments + 1):
+        posts.append(
+            {
+                "id": 1000 + round,
+                "slug": SLUG % round,
+                "modified": "2025-01-%02dT20:00:00" % (round % 28 + 1),
+                "content": {
+                    "rendered": make_content(round, games, rows, seed)
+                },
+            }
+        )
+    posts.append(
+        {
+            "id": 1,
+            "slug": "novinky",
+            "modified": "2025-01-01T00:00:00",
+            "content": {"rendered": "<p>Novinky</p>"},
+        }
+    )
+    return posts
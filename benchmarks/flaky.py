@@ -0,0 +1,219 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from arkadisti.http_session import CircuitOpenError, HttpClient
+
+REQUESTS = 100
+READ_TIMEOUT = 0.3
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    def log_message(self, *_):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+            roll = server.random.random()
+
+        if server.down:
+            self.send_status(503)
+            return
+        rate_limit = server.hang_rate + server.rate_limit_rate
+        if roll < server.hang_rate:
+            time.sleep(server.hang)
+        elif roll < rate_limit:
+            self.send_status(429, {"Retry-After": "1"})
+            return
+        elif roll < rate_limit + server.fail_rate:
+            self.send_status(503)
+            return
+
+        etag = '"%d"' % server.version
+        if self.headers.get("If-None-Match") == etag:
+            self.send_status(304, {"ETag": etag})
+            return
+        body = json.dumps({"path": self.path, "version": server.version})
+        self.send_status(200, {"ETag": etag}, body)
+
+    def send_status(self, status, headers=None, body=""):
+        data = body.encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            pass
+
+
+class FlakyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        fail_rate=0.3,
+        rate_limit_rate=0.1,
+        hang_rate=0.05,
+        hang=2.0,
+        seed=0,
+    ):
+        super().__init__(("127.0.0.1", 0), FlakyHandler)
+        self.fail_rate = fail_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.hang_rate = hang_rate
+        self.hang = hang
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.down = False
+        self.version = 1
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d/api" % self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def timed_requests(func, count):
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    for i in range(count):
+        began = time.perf_counter()
+        try:
+            response = func(i)
+            if response.status_code != 200:
+                failures += 1
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - began)
+    return time.perf_counter() - start, latencies, failures
+
+
+def client(cache_dir=None, **kwargs):
+    return HttpClient(
+        cache_dir,
+        timeout=(0.3, READ_TIMEOUT),
+        retries=4,
+        backoff=0.02,
+        backoff_max=1,
+        deadline=3,
+        **kwargs,
+    )
+
+
+def bench_http(bench, args, cache_dir):
+    server = FlakyServer(seed=args.seed)
+    try:
+        resilient = client()
+        plain = resilient.session
+        count = REQUESTS
+
+        for name, func in (
+            (
+                "http.flaky_plain",
+                lambda i: plain.get(
+                    server.url, params={"i": i}, timeout=(0.3, READ_TIMEOUT)
+                ),
+            ),
+            (
+                "http.flaky_client",
+                lambda i: resilient.get(server.url, params={"i": i}),
+            ),
+        ):
+            seconds, latencies, failures = timed_requests(func, count)
+            bench.record(
+                name,
+                seconds,
+                count,
+                success_rate=1 - failures / count,
+                p50=percentile(latencies, 0.5),
+                p95=percentile(latencies, 0.95),
+                max=max(latencies),
+            )
+        plain_rate = bench.results["http.flaky_plain"]["success_rate"]
+        client_rate = bench.results["http.flaky_client"]["success_rate"]
+        bench.check(
+            "client obsluhuje flaky server",
+            client_rate >= 0.95 and client_rate > plain_rate,
+        )
+        bench.check(
+            "latence klienta je omezena deadlinem",
+            bench.results["http.flaky_client"]["max"] <= 3 + 0.5,
+        )
+
+        server.down = True
+        breaker = client(breaker_threshold=3, breaker_cooldown=60)
+        hits = server.hits
+        seconds, latencies, failures = timed_requests(
+            lambda i: breaker.get(server.url), 10
+        )
+        bench.record(
+            "http.circuit_breaker",
+            seconds,
+            10,
+            requests_sent=server.hits - hits,
+            open_latency=latencies[-1],
+        )
+        try:
+            breaker.get(server.url)
+            opened = False
+        except CircuitOpenError:
+            opened = True
+        bench.check("circuit breaker se otevře", opened)
+        bench.check(
+            "otevřený breaker neposílá požadavky",
+            server.hits - hits <= 3 * 5,
+        )
+
+        server.down = False
+        server.fail_rate = server.rate_limit_rate = server.hang_rate = 0
+        cached = client(cache_dir, max_age=0, stale_while_revalidate=0)
+        cached.get_cached(server.url, params={"page": 1})
+        server.down = True
+        start = time.perf_counter()
+        response = cached.get_cached(server.url, params={"page": 1})
+        bench.record("http.stale_if_error", time.perf_counter() - start, 1)
+        bench.check(
+            "při výpadku se vrátí poslední dobrá odpověď",
+            response.status_code == 200 and response.stale,
+        )
+
+        server.down = False
+        server.version = 2
+        swr = client(cache_dir, max_age=0, stale_while_revalidate=60)
+        start = time.perf_counter()
+        response = swr.get_cached(server.url, params={"page": 1})
+        bench.record(
+            "http.stale_while_revalidate", time.perf_counter() - start, 1
+        )
+        stale_version = response.json()["version"]
+        deadline = time.monotonic() + 5
+        while swr.refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        fresh = swr.get_cached(
+            server.url, params={"page": 1}, stale_while_revalidate=0
+        )
+        bench.check(
+            "stale-while-revalidate vrátí cache a obnoví ji na pozadí",
+            stale_version == 1 and fresh.json()["version"] == 2,
+        )
+    finally:
+        server.stop()
@@ -0,0 +1,423 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import QCoreApplication, Qt  # noqa: E402
+
+from arkadisti import scraper  # noqa: E402
+from arkadisti.changes import Changes  # noqa: E402
+from arkadisti.games_model import ROLE_COLUMNS, GamesModel  # noqa: E402
+from arkadisti.player_index import PlayerIndex  # noqa: E402
+from arkadisti.rankings import Rankings  # noqa: E402
+from arkadisti.results_model import ResultsModel  # noqa: E402
+from arkadisti.scraper import Scraper  # noqa: E402
+from arkadisti.storage_manager import StorageManager  # noqa: E402
+
+from .fixtures import make_content, make_posts, rom_name  # noqa: E402
+from .flaky import bench_http  # noqa: E402
+from .server import WordPressServer  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class Bench:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = {}
+        self.checks = {}
+
+    def measure(self, name, func, ops=1, repeat=None, setup=None):
+        times = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        best = min(times)
+        self.results[name] = {
+            "seconds": best,
+            "mean": sum(times) / len(times),
+            "repeat": len(times),
+            "ops": ops,
+            "ops_per_sec": ops / best if best else None,
+        }
+        print("%-32s %10.2f ms %14.0f ops/s" % (name, best * 1000, ops / best))
+
+    def record(self, name, seconds, ops=1, **metrics):
+        self.results[name] = {
+            "seconds": seconds,
+            "repeat": 1,
+            "ops": ops,
+            "ops_per_sec": ops / seconds if seconds else None,
+            **metrics,
+        }
+        print(
+            "%-32s %10.2f ms %s"
+            % (
+                name,
+                seconds * 1000,
+                " ".join(
+                    "%s=%.3g" % (key, value) for key, value in metrics.items()
+                ),
+            )
+        )
+
+    def check(self, name, ok):
+        self.checks[name] = bool(ok)
+        print("%-32s %s" % ("  " + name, "OK" if ok else "SELHALO"))
+
+
+def bench_scraper(bench, posts, args):
+    contents = [post["content"]["rendered"] for post in posts[:-1]]
+    content = contents[0]
+
+    bench.measure(
+        "scraper.get_rom_names",
+        lambda: [Scraper.get_rom_names(c) for c in contents],
+        ops=len(contents),
+    )
+    bench.measure(
+        "scraper.scrape_table",
+        lambda: [
+            Scraper.scrape_table(content, rom_name(1, game))
+            for game in range(args.games)
+        ],
+        ops=args.games,
+    )
+
+
+def bench_download(bench, posts, args):
+    server = WordPressServer(posts, latency=args.latency).start()
+    scraper.API_URL = server.api_url
+    storage = StorageManager.instance()
+    try:
+        bench.measure(
+            "scraper.download_full",
+            lambda: Scraper.download(
+                incremental=False, workers=args.workers, storage=storage
+            ),
+            ops=args.tournaments,
+            repeat=args.download_repeat,
+        )
+        bench.measure(
+            "scraper.download_noop",
+            lambda: Scraper.download(workers=args.workers, storage=storage),
+            repeat=args.download_repeat,
+        )
+
+        def change_post():
+            post = posts[0]
+            round = int(post["slug"].rsplit("-", 1)[1])
+            post["modified"] = datetime.now().isoformat(timespec="seconds")
+            post["content"]["rendered"] = make_content(
+                round, args.games, args.rows, seed=time.perf_counter_ns()
+            )
+
+        bench.measure(
+            "scraper.download_changed",
+            lambda: Scraper.download(workers=args.workers, storage=storage),
+            repeat=args.download_repeat,
+            setup=change_post,
+        )
+    finally:
+        server.stop()
+
+
+def bench_storage(bench, posts, args):
+    frames = {}
+    for post in posts[:-1]:
+        round = int(post["slug"].rsplit("-", 1)[1])
+        _roms, frames[round] = Scraper.scrape_post(post["content"]["rendered"])
+    games = [
+        (round, game) for round, tables in frames.items() for game in tables
+    ]
+    path = Path("bench.h5")
+
+    def write():
+        storage = StorageManager(str(path))
+        for round, tables in frames.items():
+            storage.put_results(round, tables)
+        storage.index_results()
+        storage.close()
+
+    bench.measure(
+        "storage.put_results",
+        write,
+        ops=len(games),
+        setup=lambda: path.unlink(missing_ok=True),
+    )
+
+    storage = StorageManager(str(path))
+
+    start = time.perf_counter()
+    results = storage.select_results()
+    bench.record(
+        "storage.select_all",
+        time.perf_counter() - start,
+        ops=len(results),
+        file_mb=path.stat().st_size / 1e6,
+        memory_mb=results.memory_usage(deep=True).sum() / 1e6,
+    )
+    round, game = games[0]
+    decoded = storage.get_results(game, round)
+    bench.check(
+        "storage.round_trip",
+        all(
+            decoded[column].astype(str).tolist()
+            == frames[round][game][column].astype(str).tolist()
+            for column in frames[round][game].columns
+        ),
+    )
+
+    def read():
+        for round, game in games:
+            storage.get_results(game, round)
+
+    bench.measure(
+        "storage.get_results_cold",
+        read,
+        ops=len(games),
+        setup=storage.close,
+    )
+    storage.cache_size = len(games)
+    read()
+    bench.measure("storage.get_results_warm", read, ops=len(games))
+
+    bench.measure("rankings.rebuild", lambda: Rankings.rebuild(storage))
+    rebuilt = Rankings.get_overall(storage)
+    latest = sorted(frames)[-2:]
+    bench.measure(
+        "rankings.update",
+        lambda: Rankings.update(storage, latest),
+        ops=len(latest),
+    )
+    bench.check(
+        "rankings.update_matches_rebuild",
+        Rankings.get_overall(storage).equals(rebuilt),
+    )
+
+    bench.measure("player_index.rebuild", lambda: PlayerIndex.rebuild(storage))
+    bench.measure(
+        "player_index.update",
+        lambda: PlayerIndex.update(storage, latest),
+        ops=len(latest),
+    )
+    bench.measure(
+        "player_index.first_update",
+        lambda: PlayerIndex.update(storage, [min(frames)]),
+        setup=lambda: PlayerIndex.rebuild(storage),
+    )
+    players = storage.select_results(columns=["Player"])["Player"]
+    names = sorted(players[players.str.strip() != ""].unique())
+    bench.measure(
+        "player_index.search",
+        lambda: [PlayerIndex.search(storage, name, False) for name in names],
+        ops=len(names),
+    )
+    scanned = storage.select_results("Player == %r" % names[0])
+    bench.check(
+        "player_index.matches_scan",
+        len(PlayerIndex.search(storage, names[0], False, None))
+        == len(scanned),
+    )
+
+    bench.measure("changes.snapshot", lambda: Changes.record(storage))
+    bench.check(
+        "changes.unchanged_is_empty",
+        Changes.record(storage, latest) == 0,
+    )
+    round = latest[-1]
+    tables = dict(frames[round])
+    game = next(iter(tables))
+    tables[game] = tables[game].assign(Score=tables[game]["Score"] + 1)
+    storage.put_results(round, tables)
+    Changes.record(storage, [round])
+    bench.check(
+        "changes.detects_improvement",
+        (Changes.get_feed(storage, game=game)["kind"] == "improved").any(),
+    )
+    bench.measure(
+        "changes.record",
+        lambda: Changes.record(storage, latest),
+        ops=len(latest),
+    )
+    bench.measure(
+        "changes.first_record",
+        lambda: Changes.record(storage, [min(frames)]),
+        setup=lambda: Changes.record(storage),
+    )
+    storage.close()
+
+
+def bench_models(bench, posts, args):
+    storage = StorageManager.instance()
+
+    games_model = GamesModel()
+    games_model.reload()
+    rows = games_model.rowCount(None)
+    indexes = [games_model.index(row, 0) for row in range(rows)]
+    roles = list(ROLE_COLUMNS)
+    bench.measure(
+        "games_model.data",
+        lambda: [
+            games_model.data(index, role)
+            for index in indexes
+            for role in roles
+        ],
+        ops=rows * len(roles),
+    )
+    bench.measure(
+        "games_model.set_filter",
+        lambda: [
+            games_model.set_filter(text) for text in ("rom1", "hra 3", "")
+        ],
+        ops=3,
+    )
+
+    round = int(posts[0]["slug"].rsplit("-", 1)[1])
+    results_model = ResultsModel()
+    results_model.reload(rom_name(round, 0), round)
+    rows = results_model.rowCount(None)
+    columns = results_model.columnCount(None)
+    indexes = [
+        results_model.index(row, column)
+        for row in range(rows)
+        for column in range(columns)
+    ]
+    bench.measure(
+        "results_model.data",
+        lambda: [
+            results_model.data(index, Qt.DisplayRole) for index in indexes
+        ],
+        ops=len(indexes),
+    )
+    bench.measure(
+        "results_model.sort",
+        lambda: [
+            results_model.sort(column, order)
+            for column in range(columns)
+            for order in (Qt.AscendingOrder, Qt.DescendingOrder)
+        ],
+        ops=columns * 2,
+    )
+    storage.close()
+
+
+def bench_network(bench, posts, args):
+    bench_http(bench, args, Path.cwd() / "http-cache")
+
+
+def compare(results, params, baseline_file):
+    baseline = json.loads(Path(baseline_file).read_text())
+    if baseline["params"] != params:
+        print("\nPozor: baseline má jiné parametry: %s" % baseline["params"])
+    print()
+    print(
+        "%-32s %12s %12s %8s"
+        % ("benchmark", "baseline/op", "current/op", "ratio")
+    )
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]
+        before = before["seconds"] / before["ops"]
+        after = result["seconds"] / result["ops"]
+        print(
+            "%-32s %9.3f ms %9.3f ms %7.2fx"
+            % (name, before * 1000, after * 1000, after / before)
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arkadisti benchmarks")
+    parser.add_argument("--tournaments", type=int, default=40)
+    parser.add_argument("--games", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--download-repeat", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument(
+        "--only",
+        choices=("scraper", "download", "storage", "models", "http"),
+        action="append",
+    )
+    args = parser.parse_args(argv)
+    args.workers = args.workers or os.cpu_count() or 1
+
+    output = args.output or RESULTS_DIR / (
+        datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    output = output.resolve()
+    baseline = args.baseline.resolve() if args.baseline else None
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    bench = Bench(args.repeat)
+    posts = make_posts(args.tournaments, args.games, args.rows, args.seed)
+
+    workdir = tempfile.mkdtemp(prefix="arkadisti-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        suites = [
+            ("scraper", bench_scraper),
+            ("download", bench_download),
+            ("storage", bench_storage),
+            ("models", bench_models),
+            ("http", bench_network),
+        ]
+        for name, suite in suites:
+            if args.only and name not in args.only:
+                continue
+            if name == "models" and args.only and "download" not in args.only:
+                bench_download(Bench(1), posts, args)
+            suite(bench, posts, args)
+    finally:
+        StorageManager.instance().close()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    del app
+
+    params = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("output", "baseline", "only")
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "params": params,
+                "results": bench.results,
+                "checks": bench.checks,
+            },
+            indent=2,
+        )
+    )
+    print("\nVýsledky uloženy do %s" % output)
+
+    if baseline:
+        compare(bench.results, params, baseline)
+
+    return 0 if all(bench.checks.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class WordPressHandler(BaseHTTPRequestHandler):
+    def log_message(self, *_):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        fields = query.get("_fields", [""])[0].split(",")
+        fields = [field for field in fields if field]
+
+        last = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if last.isdigit():
+            post = server.posts_by_id.get(int(last))
+            if post is None:
+                self.send_error(404)
+                return
+            etag = '"%s"' % post["modified"]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_json(self.select(post, fields), {"ETag": etag})
+            return
+
+        posts = server.posts
+        if "include" in query:
+            ids = {int(x) for x in query["include"][0].split(",")}
+            posts = [post for post in posts if post["id"] in ids]
+        per_page = int(query.get("per_page", ["10"])[0])
+        page = int(query.get("page", ["1"])[0])
+        chunk = posts[(page - 1) * per_page:page * per_page]
+        self.send_json(
+            [self.select(post, fields) for post in chunk],
+            {
+                "X-WP-Total": str(len(posts)),
+                "X-WP-TotalPages": str(
+                    max(1, math.ceil(len(posts) / per_page))
+                ),
+            },
+        )
+
+    @staticmethod
+    def select(post, fields):
+        if not fields:
+            return post
+        return {key: value for key, value in post.items() if key in fields}
+
+    def send_json(self, data, headers):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class WordPressServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, posts, latency=0.0, port=0):
+        super().__init__(("127.0.0.1", port), WordPressHandler)
+        self.latency = latency
+        self.set_posts(posts)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def set_posts(self, posts):
+        self.posts = posts
+        self.posts_by_id = {post["id"]: post for post in posts}
+
+    @property
+    def api_url(self):
+        return "http://127.0.0.1:%d/wp-json/wp/v2/posts/" % (
+            self.server_address[1]
+        )
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,11 +1,18 @@
-import sys
+import time
 
-from PySide6.QtWidgets import QApplication
+STARTED = time.perf_counter()
 
-from arkadisti.main_window import MainWindow
+import multiprocessing  # noqa: E402
+import sys  # noqa: E402
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    from PySide6.QtWidgets import QApplication
+
+    from arkadisti.main_window import MainWindow
+
     app = QApplication(sys.argv)
-    widget = MainWindow()
+    widget = MainWindow(started=STARTED)
     widget.show()
     sys.exit(app.exec())
@@ -0,0 +1,246 @@
+import email.utils
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from arkadisti.http_session import (
+    CachedResponse,
+    CircuitOpenError,
+    HttpClient,
+)
+from benchmarks.flaky import FlakyServer
+
+
+@pytest.fixture
+def server():
+    server = FlakyServer(fail_rate=0, rate_limit_rate=0, hang_rate=0)
+    yield server
+    server.stop()
+
+
+def client(cache_dir=None, **kwargs):
+    options = {
+        "timeout": (0.5, 0.5),
+        "retries": 2,
+        "backoff": 0.001,
+        "backoff_max": 0.01,
+        "deadline": 5,
+    }
+    options.update(kwargs)
+    return HttpClient(cache_dir, **options)
+
+
+def response(retry_after=None):
+    headers = {} if retry_after is None else {"Retry-After": retry_after}
+    return SimpleNamespace(headers=headers)
+
+
+def test_retry_after_seconds():
+    assert HttpClient.retry_after(response("3")) == 3.0
+    assert HttpClient.retry_after(response(" 7 ")) == 7.0
+
+
+def test_retry_after_http_date():
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= HttpClient.retry_after(response(date)) <= 30
+
+    past = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert HttpClient.retry_after(response(past)) == 0.0
+
+
+def test_retry_after_missing_or_invalid():
+    assert HttpClient.retry_after(response()) is None
+    assert HttpClient.retry_after(response("")) is None
+    assert HttpClient.retry_after(response("soon")) is None
+
+
+def test_retry_delay_bounds():
+    http = client(backoff=0.5, backoff_max=4)
+    for attempt in range(10):
+        limit = min(4, 0.5 * 2**attempt)
+        for _ in range(50):
+            assert limit / 2 <= http.retry_delay(attempt) <= limit
+
+
+def test_retry_delay_honours_retry_after():
+    http = client(backoff=0.5, backoff_max=4)
+    assert http.retry_delay(0, response("2")) == 2.0
+    assert http.retry_delay(0, response("120")) == 120.0
+    assert 0.25 <= http.retry_delay(0, response("soon")) <= 0.5
+
+
+def test_success_is_not_retried(server):
+    assert client().get(server.url).status_code == 200
+    assert server.hits == 1
+
+
+def test_failure_is_retried_until_exhausted(server):
+    server.fail_rate = 1
+    assert client(retries=2).get(server.url).status_code == 503
+    assert server.hits == 3
+
+
+def test_rate_limit_waits_for_retry_after(server):
+    server.rate_limit_rate = 1
+    start = time.monotonic()
+    assert client(retries=1, backoff_max=2).get(server.url).status_code == 429
+    assert server.hits == 2
+    assert time.monotonic() - start >= 1
+
+
+def test_long_retry_after_is_not_retried(server):
+    server.rate_limit_rate = 1
+    http = client(retries=3, breaker_threshold=1, breaker_cooldown=60)
+    start = time.monotonic()
+    assert http.get(server.url).status_code == 429
+    assert server.hits == 1
+    assert time.monotonic() - start < 1
+    with pytest.raises(CircuitOpenError):
+        http.get(server.url)
+
+
+def test_retry_after_beyond_deadline_is_not_retried(server):
+    server.rate_limit_rate = 1
+    http = client(retries=3, backoff_max=2, deadline=0.5)
+    assert http.get(server.url).status_code == 429
+    assert server.hits == 1
+
+
+def test_breaker_opens_after_threshold(server):
+    server.down = True
+    http = client(retries=0, breaker_threshold=2, breaker_cooldown=60)
+    for _ in range(2):
+        assert http.get(server.url).status_code == 503
+
+    with pytest.raises(CircuitOpenError):
+        http.get(server.url)
+    assert server.hits == 2
+
+
+def test_breaker_half_open_closes_on_success(server):
+    server.down = True
+    http = client(retries=0, breaker_threshold=1, breaker_cooldown=0.2)
+    http.get(server.url)
+    with pytest.raises(CircuitOpenError):
+        http.get(server.url)
+
+    time.sleep(0.25)
+    server.down = False
+    assert http.get(server.url).status_code == 200
+    breaker = http.breaker(server.url)
+    assert breaker.opened is None
+    assert breaker.failures == 0
+    assert http.get(server.url).status_code == 200
+
+
+def test_breaker_half_open_reopens_on_failure(server):
+    server.down = True
+    http = client(retries=0, breaker_threshold=1, breaker_cooldown=0.2)
+    http.get(server.url)
+
+    time.sleep(0.25)
+    hits = server.hits
+    assert http.get(server.url).status_code == 503
+    assert server.hits == hits + 1
+    with pytest.raises(CircuitOpenError):
+        http.get(server.url)
+    assert server.hits == hits + 1
+
+
+def test_breaker_allows_one_probe_when_half_open(server):
+    server.down = True
+    http = client(retries=0, breaker_threshold=1, breaker_cooldown=0.2)
+    http.get(server.url)
+
+    time.sleep(0.25)
+    breaker = http.breaker(server.url)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_revalidate_not_modified(server, tmp_path):
+    http = client(tmp_path)
+    first = http.get_cached(server.url, params={"page": 1})
+    assert first.status_code == 200
+    cached = http.read_cache(http.cache_path(server.url, {"page": 1}))
+
+    time.sleep(0.01)
+    second = http.get_cached(server.url, params={"page": 1})
+    assert isinstance(second, CachedResponse)
+    assert not second.stale
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.time > cached["time"]
+    assert server.hits == 2
+
+
+def test_revalidate_modified(server, tmp_path):
+    http = client(tmp_path)
+    http.get_cached(server.url, params={"page": 1})
+
+    server.version = 2
+    response = http.get_cached(server.url, params={"page": 1})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    cached = http.get_cached(server.url, params={"page": 1})
+    assert cached.json()["version"] == 2
+
+
+def test_fresh_cache_skips_request(server, tmp_path):
+    http = client(tmp_path, max_age=60)
+    http.get_cached(server.url)
+    assert http.get_cached(server.url).json()["version"] == 1
+    assert server.hits == 1
+
+
+def test_stale_if_error(server, tmp_path):
+    http = client(tmp_path)
+    http.get_cached(server.url, params={"page": 1})
+
+    server.down = True
+    response = http.get_cached(server.url, params={"page": 1})
+    assert response.status_code == 200
+    assert response.stale
+    assert response.json()["version"] == 1
+
+
+def test_stale_if_breaker_open(server, tmp_path):
+    http = client(tmp_path, retries=0, breaker_threshold=1)
+    http.get_cached(server.url, params={"page": 1})
+
+    server.down = True
+    http.get(server.url)
+    hits = server.hits
+    response = http.get_cached(server.url, params={"page": 1})
+    assert response.stale
+    assert server.hits == hits
+
+
+def test_stale_if_error_disabled(server, tmp_path):
+    http = client(tmp_path, retries=0)
+    http.get_cached(server.url, params={"page": 1})
+
+    server.down = True
+    response = http.get_cached(
+        server.url, params={"page": 1}, stale_if_error=False
+    )
+    assert response.status_code == 503
+    assert not isinstance(response, CachedResponse)
+
+
+def test_stale_if_error_disabled_breaker_open(server, tmp_path):
+    http = client(tmp_path, retries=0, breaker_threshold=1)
+    http.get_cached(server.url, params={"page": 1})
+
+    server.down = True
+    http.get(server.url)
+    with pytest.raises(CircuitOpenError):
+        http.get_cached(server.url, params={"page": 1}, stale_if_error=False)
+
+
+def test_error_without_cache(server, tmp_path):
+    server.down = True
+    response = client(tmp_path).get_cached(server.url, params={"page": 1})
+    assert response.status_code == 503
+    assert not list((tmp_path / "http").glob("*.json"))